@@ -0,0 +1,187 @@
+"""
+Offline benchmarks for the Turbasen client, run against a local stub server. Usage:
+
+    python -m benchmarks.run [--latency 0.005] [--payload-size 1024] [--compression]
+                             [--http2] [--output results.json]
+
+Results are written as JSON, one entry per scenario, so they can be compared across releases.
+"""
+from datetime import datetime
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import turbasen
+from turbasen.settings import Settings
+
+from .server import StubTurbasen
+
+class DictCache:
+    """Process-local cache implementing the cache API expected by `Settings.CACHE`"""
+    def __init__(self):
+        self.keys = {}
+
+    def get(self, key):
+        return self.keys.get(key)
+
+    def set(self, key, value, duration):
+        self.keys[key] = value
+
+    def delete(self, key):
+        self.keys.pop(key, None)
+
+    def clear(self):
+        self.keys = {}
+
+class Benchmark:
+    def __init__(self, stub, documents, iterations, http2=False):
+        self.stub = stub
+        self.documents = documents
+        self.iterations = iterations
+        self.http2 = http2
+        self.cache = DictCache()
+        self.ids = stub.populate('steder', documents)
+
+    def configure(self, cache=False, etag_cache_period=60 * 60):
+        self.cache.clear()
+        turbasen.configure(
+            CACHE=self.cache if cache else turbasen.cache.DummyCache(),
+            ETAG_CACHE_PERIOD=etag_cache_period,
+        )
+
+    def measure(self, name, operation, setup=None):
+        timings = []
+        self.stub.reset_counters()
+        for iteration in range(self.iterations):
+            if setup is not None:
+                setup(iteration)
+            start = time.perf_counter()
+            operation(iteration)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        return {
+            'name': name,
+            'iterations': self.iterations,
+            'requests_per_op': self.stub.requests / self.iterations,
+            'bytes_per_op': self.stub.bytes_sent / self.iterations,
+            'mean': statistics.mean(timings),
+            'median': statistics.median(timings),
+            'p95': timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0],
+            'min': timings[0],
+            'max': timings[-1],
+        }
+
+    def object_id(self, iteration):
+        return self.ids[iteration % len(self.ids)]
+
+    def run(self):
+        results = []
+
+        self.configure()
+        results.append(self.measure('get', lambda i: turbasen.Sted.get(self.object_id(i))))
+
+        self.configure(cache=True)
+        turbasen.Sted.get(self.object_id(0))
+        results.append(self.measure('get_cached', lambda i: turbasen.Sted.get(self.object_id(0))))
+
+        self.configure(cache=True, etag_cache_period=0)
+        turbasen.Sted.get(self.object_id(0))
+        results.append(self.measure(
+            'get_revalidated',
+            lambda i: turbasen.Sted.get(self.object_id(0)),
+        ))
+
+        self.configure()
+        results.append(self.measure('list', lambda i: turbasen.Sted.list()))
+
+        self.configure(cache=True)
+        turbasen.Sted.list()
+        results.append(self.measure('list_cached', lambda i: turbasen.Sted.list()))
+
+        self.configure(cache=True)
+        turbasen.Sted.list()
+        results.append(self.measure(
+            'list_revalidated',
+            lambda i: turbasen.Sted.list(),
+            setup=lambda i: turbasen.Sted._invalidate_lists(),
+        ))
+
+        self.configure()
+        results.append(self.measure('count', lambda i: turbasen.Sted.count()))
+
+        self.configure()
+        partials = {}
+        results.append(self.measure(
+            'partial_fetch',
+            lambda i: partials[i]['beskrivelse'],
+            setup=lambda i: partials.update({i: turbasen.Sted(
+                _is_partial=True,
+                _id=self.object_id(i),
+            )}),
+        ))
+
+        self.configure()
+        results.append(self.measure('save', lambda i: turbasen.Sted(
+            navn='Benchmark %s' % i,
+            status='Kladd',
+            beskrivelse='x' * self.stub.payload_size,
+        ).save()))
+
+        # Responses compressed and uncompressed, with clients' own sessions
+        self.configure()
+        for compression in [True, False]:
+            suffix = '' if compression else '_uncompressed'
+            client = turbasen.TurbasenClient(COMPRESSION=compression, HTTP2=self.http2)
+            results.append(self.measure(
+                'client_get' + suffix,
+                lambda i: client.Sted.get(self.object_id(i)),
+            ))
+            results.append(self.measure('client_list' + suffix, lambda i: client.Sted.list()))
+            client.close()
+
+        return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0, help="Server latency in seconds")
+    parser.add_argument('--payload-size', type=int, default=1024, help="Description size in bytes")
+    parser.add_argument('--list-etags', action='store_true', help="Send ETags for list pages")
+    parser.add_argument('--compression', action='store_true', help="Send gzip compressed JSON")
+    parser.add_argument('--http2', action='store_true', help="Use HTTP/2 clients (needs httpx)")
+    parser.add_argument('--documents', type=int, default=200, help="Documents in the collection")
+    parser.add_argument('--limit', type=int, default=Settings.LIMIT, help="Documents per page")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--output', help="Write results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    stub = StubTurbasen(
+        latency=args.latency,
+        payload_size=args.payload_size,
+        list_etags=args.list_etags,
+        compression=args.compression,
+    )
+    turbasen.configure(ENDPOINT_URL=stub.serve(), API_KEY='benchmark', LIMIT=args.limit)
+    try:
+        results = Benchmark(stub, args.documents, args.iterations, args.http2).run()
+    finally:
+        stub.shutdown()
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'parameters': vars(args),
+        'results': results,
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, unquote, urlsplit
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+class StubTurbasen:
+    """In-memory emulation of the parts of the Turbasen API used by the client: paginated lists
+    (limit/skip/total/fields), document GET with ETag/If-None-Match and POST/PUT/PATCH/DELETE.
+    List pages have ETags only if `list_etags` is set. JSON responses are gzip compressed for
+    clients accepting it if `compression` is set. Static files, such as images, are served from
+    the `files` dict of paths to bytes. Documents are listed in the order they were created."""
+    def __init__(self, latency=0, payload_size=1024, list_etags=False, compression=False):
+        self.latency = latency
+        self.payload_size = payload_size
+        self.list_etags = list_etags
+        self.compression = compression
+        self.collections = OrderedDict()
+        self.files = {}
+        self.next_id = 1
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def populate(self, identifier, count):
+        collection = self.collections.setdefault(identifier, OrderedDict())
+        for index in range(count):
+            document = {
+                '_id': self.create_id(),
+                'navn': '%s %s' % (identifier, index),
+                'status': 'Offentlig',
+                'endret': '2016-01-01T00:00:00.000Z',
+                'tags': ['Hytte'],
+                'beskrivelse': 'x' * self.payload_size,
+            }
+            self.store(identifier, document)
+        return list(collection)
+
+    def create_id(self):
+        with self.lock:
+            self.next_id += 1
+            return '%024x' % (self.next_id - 1)
+
+    def store(self, identifier, document):
+        document.pop('checksum', None)
+        document['checksum'] = hashlib.md5(
+            json.dumps(document, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        self.collections.setdefault(identifier, OrderedDict())[document['_id']] = document
+        return document
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def serve(self, host='127.0.0.1', port=0):
+        """Start serving in a daemon thread and return the endpoint URL"""
+        stub = self
+
+        class Handler(StubHandler):
+            backend = stub
+
+        self.httpd = StubServer((host, port), Handler)
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        return 'http://%s:%s' % self.httpd.server_address
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # Accept bursts of concurrent connections without the client retrying SYNs
+    request_queue_size = 128
+
+class StubHandler(BaseHTTPRequestHandler):
+    backend = None
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, persistent connections wait for
+    # delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_PATCH(self):
+        self.dispatch('PATCH')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method):
+        backend = self.backend
+        with backend.lock:
+            backend.requests += 1
+        if backend.latency:
+            time.sleep(backend.latency)
+
+        url = urlsplit(self.path)
+        if url.path in backend.files:
+            self.send_file(backend.files[url.path])
+            return
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = [unquote(part) for part in url.path.strip('/').split('/')]
+        collection = backend.collections.setdefault(path[0], OrderedDict())
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length).decode('utf-8')) if length else None
+
+        if len(path) == 1 and method == 'GET':
+            self.list_documents(collection, query)
+        elif len(path) == 1 and method == 'POST':
+            body['_id'] = backend.create_id()
+            self.respond(201, {'document': backend.store(path[0], body)})
+        elif path[1] not in collection:
+            self.respond(404, {'message': 'Not found'})
+        elif method == 'GET':
+            document = collection[path[1]]
+            etag = '"%s"' % document['checksum']
+            if self.headers.get('If-None-Match') == etag:
+                self.respond(304, None, {'ETag': etag})
+            else:
+                self.respond(200, document, {'ETag': etag})
+        elif method == 'PUT':
+            body['_id'] = path[1]
+            self.respond(200, {'document': backend.store(path[0], body)})
+        elif method == 'PATCH':
+            document = dict(collection[path[1]], **body)
+            self.respond(200, {'document': backend.store(path[0], document)})
+        elif method == 'DELETE':
+            del collection[path[1]]
+            self.respond(204, None)
+
+    def send_file(self, content):
+        etag = '"%s"' % hashlib.md5(content).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.count_bytes(content)
+        self.wfile.write(content)
+
+    def list_documents(self, collection, query):
+        limit = int(query.get('limit', 20))
+        skip = int(query.get('skip', 0))
+        fields = [field for field in query.get('fields', '').split(',') if field]
+        documents = list(collection.values())[skip:skip + limit]
+        body = {
+            'documents': [
+                {key: value for key, value in document.items() if key == '_id' or key in fields}
+                for document in documents
+            ],
+            'count': len(documents),
+            'total': len(collection),
+        }
+
+        if not self.backend.list_etags:
+            self.respond(200, body)
+            return
+
+        etag = '"%s"' % hashlib.md5(json.dumps(body).encode('utf-8')).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.respond(304, None, {'ETag': etag})
+        else:
+            self.respond(200, body, {'ETag': etag})
+
+    def respond(self, status, body, headers={}):
+        payload = b'' if body is None else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            if self.backend.compression and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                payload = gzip.compress(payload)
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.count_bytes(payload)
+        self.wfile.write(payload)
+
+    def count_bytes(self, payload):
+        # Counted before writing, so the counter is up to date when the client has the response
+        with self.backend.lock:
+            self.backend.bytes_sent += len(payload)
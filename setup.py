@@ -27,5 +27,8 @@ setup(
     install_requires=['requests>=2.10.0,<3'],
     extras_require={
         'dev': ['sphinx', 'ipython', 'flake8'],
+        'geometry': ['numpy'],
+        'http2': ['httpx[http2]'],
+        'brotli': ['brotli'],
     }
 )
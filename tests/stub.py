@@ -0,0 +1,36 @@
+import unittest
+
+from benchmarks.server import StubTurbasen
+from turbasen.settings import Settings
+import turbasen
+
+class StubTestCase(unittest.TestCase):
+    """Runs a stub Turbasen server for each test, with the global settings pointing at it. Global
+    settings changed with `configure` are restored after each test."""
+    stub_options = {'payload_size': 16}
+
+    def setUp(self):
+        self.settings = {}
+        self.addCleanup(self.restore_settings)
+
+        self.stub = StubTurbasen(**self.stub_options)
+        self.endpoint_url = self.stub.serve()
+        self.addCleanup(self.stub.shutdown)
+        self.configure(ENDPOINT_URL=self.endpoint_url, LIMIT=20)
+
+    def configure(self, **settings):
+        """Change global settings for the current test"""
+        for key in settings:
+            self.settings.setdefault(key, getattr(Settings, key))
+        turbasen.configure(**settings)
+
+    def restore_settings(self):
+        turbasen.configure(**self.settings)
+
+    def create_client(self, **settings):
+        """Return a client for the stub server, unless another ENDPOINT_URL is given, closed after
+        the current test"""
+        settings.setdefault('ENDPOINT_URL', self.endpoint_url)
+        client = turbasen.TurbasenClient(**settings)
+        self.addCleanup(client.close)
+        return client
@@ -2,6 +2,8 @@ import unittest
 
 import turbasen
 
+from .stub import StubTestCase
+
 class ObjectsFixture:
     def __init__(self):
         self.bilde = turbasen.Bilde(
@@ -174,6 +176,14 @@ class TestClass(unittest.TestCase):
         results = turbasen.Sted.list(params={'foo': 404})
         self.assertEqual(len(results), 0)
 
+    @unittest.skipIf(turbasen.settings.Settings.API_KEY == '', "API key not set")
+    def test_count(self):
+        params = {'tags': 'Hytte', 'betjeningsgrad': 'Betjent'}
+        count = turbasen.Sted.count(params=params)
+        self.assertGreater(count, 0)
+        self.assertEqual(count, len(turbasen.Sted.list(params=params)))
+        self.assertEqual(turbasen.Sted.count(params={'foo': 404}), 0)
+
     def test_list_fields(self):
         results = turbasen.Sted.list(pages=1, params={
             'fields': ['betjeningsgrad'],
@@ -218,3 +228,21 @@ class TestClass(unittest.TestCase):
         self.assertEqual(self.objects.sted, self.objects.sted)
         self.assertEqual(self.objects.sted, sted_retrieved)
         self.assertNotEqual(sted_retrieved, sted_unsaved)
+
+    def test_reference_ids(self):
+        tur = turbasen.Tur(steder=['a', {'_id': 'b'}], bilder='c')
+        self.assertEqual(tur._reference_ids('steder'), ['a', 'b'])
+        self.assertEqual(tur._reference_ids('bilder'), ['c'])
+        self.assertEqual(tur._reference_ids('grupper'), [])
+
+    def test_datatype(self):
+        self.assertIs(turbasen.apiclient.NTBObject._datatype('steder'), turbasen.Sted)
+        self.assertIs(turbasen.apiclient.NTBObject._datatype('områder'), turbasen.Område)
+        with self.assertRaises(ValueError):
+            turbasen.apiclient.NTBObject._datatype('foo')
+
+class StubTestClass(StubTestCase):
+    def test_count(self):
+        self.stub.populate('steder', 25)
+        self.assertEqual(turbasen.Sted.count(), 25)
+        self.assertEqual(self.stub.requests, 1)
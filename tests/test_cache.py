@@ -3,12 +3,17 @@ import unittest
 
 import turbasen
 
+from .stub import StubTestCase
+
 class PermanentDictCache:
     """Simple dict cache which counts hits and misses"""
     keys = {}
     hits = 0
     misses = 0
 
+    def __init__(self):
+        self.keys = {}
+
     def get(self, key):
         if key in self.keys:
             self.hits += 1
@@ -19,6 +24,9 @@ class PermanentDictCache:
     def set(self, key, value, retainment):
         self.keys[key] = value
 
+    def delete(self, key):
+        self.keys.pop(key, None)
+
     def clear(self):
         self.keys = {}
         self.hits = 0
@@ -85,3 +93,110 @@ class TestClass(unittest.TestCase):
             partial_sted._fetch()
             self.assertEqual(cache.hits, 2)
             self.assertEqual(cache.misses, 2)
+
+    def test_list_generation(self):
+        with self.configure_cache():
+            generation = turbasen.Sted._list_generation()
+            self.assertEqual(generation, turbasen.Sted._list_generation())
+            self.assertNotEqual(generation, turbasen.Tur._list_generation())
+
+            turbasen.Sted._invalidate_lists()
+            self.assertNotEqual(generation, turbasen.Sted._list_generation())
+
+    def test_list_document_resolved_from_cache(self):
+        with self.configure_cache() as cache:
+            document = {'_id': 'abc', 'navn': 'Testhytta', 'checksum': '42'}
+            partial = turbasen.Sted._from_list_document(document)
+            self.assertTrue(partial._is_partial)
+
+            cached = turbasen.Sted(_etag='"42"', beskrivelse='Full', **document)
+            self.assertIs(cache.get('turbasen.object.abc'), cached)
+            self.assertIs(turbasen.Sted._from_list_document(document), cached)
+
+            # A changed checksum means the cached object is stale
+            document['checksum'] = '43'
+            self.assertTrue(turbasen.Sted._from_list_document(document)._is_partial)
+
+    def test_references_resolved_from_cache(self):
+        with self.configure_cache():
+            sted = turbasen.Sted(_etag='"1"', _id='abc', navn='Testhytta')
+            tur = turbasen.Tur(navn='Testtur', steder=['abc', 'abc'])
+            self.assertEqual(tur.references('steder'), [sted, sted])
+            self.assertIsInstance(tur.references('steder')[0], turbasen.Sted)
+
+    def test_references_revalidated(self):
+        with self.configure_cache():
+            turbasen.Sted(_etag='"1"', _id='abc', navn='Testhytta')
+            tur = turbasen.Tur(navn='Testtur', steder=['abc'])
+            self.assertEqual(tur.references('steder')[0]['navn'], 'Testhytta')
+
+            # A newer version of a resolved reference is used once it's cached
+            turbasen.Sted(_etag='"2"', _id='abc', navn='Endret')
+            self.assertEqual(tur.references('steder')[0]['navn'], 'Endret')
+
+    def test_tiered_cache(self):
+        cache = turbasen.cache.TieredCache(self.cache, size=2)
+        cache.set('foo', 42, 3600)
+        self.assertEqual(cache.get('foo'), 42)
+        self.assertEqual(self.cache.hits, 0)
+
+        # Evict 'foo' from the local cache; it is retrieved from the shared cache
+        cache.set('bar', 43, 3600)
+        cache.set('baz', 44, 3600)
+        self.assertEqual(cache.get('foo'), 42)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(cache.get('foo'), 42)
+        self.assertEqual(self.cache.hits, 1)
+
+        cache.delete('foo')
+        self.assertIsNone(cache.get('foo'))
+        self.assertIsNone(self.cache.get('foo'))
+
+    def test_tiered_cache_copies(self):
+        cache = turbasen.cache.TieredCache(turbasen.cache.DummyCache())
+        sted = turbasen.Sted(_etag='"1"', _id='abc', navn='Testhytta')
+        cache.set('sted', sted, 3600)
+        sted['navn'] = 'Endret'
+
+        # Changes to stored or returned objects don't change the cached object
+        cached = cache.get('sted')
+        self.assertEqual(cached['navn'], 'Testhytta')
+        cached['navn'] = 'Endret'
+        self.assertEqual(cache.get('sted')['navn'], 'Testhytta')
+        self.assertIsNot(cache.get('sted'), cache.get('sted'))
+
+    def test_tiered_cache_expiry(self):
+        cache = turbasen.cache.TieredCache(self.cache, timeout=0)
+        cache.set('foo', 42, 3600)
+        self.assertEqual(cache.get('foo'), 42)
+        self.assertEqual(self.cache.hits, 1)
+
+class PageTestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stub.populate('steder', 25)
+        self.configure(CACHE=PermanentDictCache())
+
+    def revalidate(self):
+        """List the collection again after invalidating its cached lists, but not its pages.
+        Returns the number of bytes sent for the first list."""
+        self.stub.reset_counters()
+        objects = turbasen.Sted.list()
+        bytes_sent = self.stub.bytes_sent
+        turbasen.Sted._invalidate_lists()
+        self.stub.reset_counters()
+        self.assertEqual(turbasen.Sted.list(), objects)
+        return bytes_sent
+
+    def test_page_etags(self):
+        self.stub.list_etags = True
+        self.revalidate()
+        # Both pages are revalidated with conditional requests
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(self.stub.bytes_sent, 0)
+
+    def test_page_checksums(self):
+        bytes_sent = self.revalidate()
+        # Without ETags, both pages are revalidated by their ids and checksums only
+        self.assertEqual(self.stub.requests, 2)
+        self.assertLess(self.stub.bytes_sent, bytes_sent)
@@ -0,0 +1,185 @@
+import json
+import pickle
+import types
+import unittest
+from unittest import mock
+
+import requests
+
+from benchmarks.server import StubTurbasen
+from turbasen import hedging, transport
+import turbasen
+
+from .stub import StubTestCase
+from .test_cache import PermanentDictCache
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stubs = [self.stub, StubTurbasen(**self.stub_options)]
+        self.ids = [stub.populate('steder', 2) for stub in self.stubs]
+        self.endpoint_urls = [self.endpoint_url, self.stubs[1].serve()]
+        self.addCleanup(self.stubs[1].shutdown)
+        self.clients = [
+            self.create_client(ENDPOINT_URL=endpoint_url + '/', CACHE=PermanentDictCache())
+            for endpoint_url in self.endpoint_urls
+        ]
+
+    def test_separate_endpoints(self):
+        first, second = self.clients
+        self.assertEqual(first.settings.ENDPOINT_URL, self.endpoint_urls[0])
+        self.assertNotEqual(second.settings.ENDPOINT_URL, turbasen.settings.Settings.ENDPOINT_URL)
+
+        sted = first.Sted.get(self.ids[0][0])
+        self.assertIsInstance(sted, turbasen.Sted)
+        self.assertIs(sted.client, first)
+        self.assertEqual(self.stubs[0].requests, 1)
+        self.assertEqual(self.stubs[1].requests, 0)
+
+        self.assertEqual(len(second.Sted.list()), 2)
+        self.assertEqual(self.stubs[1].requests, 1)
+        self.assertEqual(first.Sted.count(), 2)
+        self.assertEqual(self.stubs[0].requests, 2)
+
+    def test_separate_caches(self):
+        first, second = self.clients
+        first.Sted.get(self.ids[0][0])
+        first.Sted.get(self.ids[0][0])
+        self.assertEqual(self.stubs[0].requests, 1)
+        key = first.Sted._cache_key('object.%s' % self.ids[0][0])
+        self.assertIsNotNone(first.settings.CACHE.get(key))
+        self.assertIsNone(second.settings.CACHE.get(key))
+
+    def test_shared_cache(self):
+        # Both stubs have documents with the same ids
+        document = self.stubs[1].collections['steder'][self.ids[1][0]]
+        document['navn'] = 'Andre steder'
+        self.stubs[1].store('steder', document)
+
+        self.configure(CACHE=PermanentDictCache())
+        first = self.create_client()
+        second = self.create_client(ENDPOINT_URL=self.endpoint_urls[1])
+        self.assertIs(first.settings.CACHE, second.settings.CACHE)
+        self.assertEqual(first.Sted.get(self.ids[0][0])['navn'], 'steder 0')
+        self.assertEqual(second.Sted.get(self.ids[1][0])['navn'], 'Andre steder')
+        self.assertEqual(len(second.Sted.list()), 2)
+        self.assertEqual(self.stubs[1].requests, 2)
+
+        # Clients with different API keys don't share cached documents either
+        third = self.create_client(ENDPOINT_URL=self.endpoint_urls[1], API_KEY='other')
+        self.assertNotEqual(
+            third.Sted._cache_key('object.%s' % self.ids[1][0]),
+            second.Sted._cache_key('object.%s' % self.ids[1][0]),
+        )
+        self.stubs[1].reset_counters()
+        third.Sted.get(self.ids[1][0])
+        third.Sted.list()
+        self.assertEqual(self.stubs[1].requests, 2)
+
+        # The global datatypes keep their own keys
+        self.assertIsNone(turbasen.Sted._get_local(self.ids[0][0]))
+
+    def test_configure(self):
+        first, second = self.clients
+        limit = turbasen.settings.Settings.LIMIT
+        first.configure(LIMIT=1)
+        self.assertEqual(first.settings.LIMIT, 1)
+        self.assertEqual(second.settings.LIMIT, limit)
+        self.assertEqual(turbasen.settings.Settings.LIMIT, limit)
+
+        first.Sted.list()
+        self.assertEqual(self.stubs[0].requests, 2)
+
+    def test_pickled_cache(self):
+        # Cache backends pickling objects return them as unbound objects, which are rebound
+        first = self.clients[0]
+        first.configure(CACHE=PickleCache())
+        sted = first.Sted.get(self.ids[0][0])
+        self.assertIs(type(pickle.loads(pickle.dumps(sted))), turbasen.Sted)
+
+        cached = first.Sted.get(self.ids[0][0])
+        self.assertIs(type(cached), first.Sted)
+        self.assertEqual(cached, sted)
+        self.assertEqual(self.stubs[0].requests, 1)
+
+    def test_compression(self):
+        self.stubs[0].compression = True
+        first = self.clients[0]
+        sted = first.Sted.get(self.ids[0][0])
+        compressed = self.stubs[0].bytes_sent
+
+        uncompressed = self.create_client(COMPRESSION=False)
+        self.stubs[0].reset_counters()
+        self.assertEqual(uncompressed.Sted.get(self.ids[0][0]).data, sted.data)
+        self.assertLess(compressed, self.stubs[0].bytes_sent)
+
+    def test_configure_session(self):
+        self.stubs[0].compression = True
+        first = self.clients[0]
+        session = first.session
+        first.Sted.get(self.ids[0][0])
+        compressed = self.stubs[0].bytes_sent
+
+        first.configure(COMPRESSION=False, CACHE=PermanentDictCache())
+        self.assertIsNot(first.session, session)
+        self.assertIs(first.Sted.session, first.session)
+        self.stubs[0].reset_counters()
+        first.Sted.get(self.ids[0][0])
+        self.assertLess(compressed, self.stubs[0].bytes_sent)
+
+        hedger = hedging.hedger(first.settings)
+        first.configure(WORKERS=2)
+        self.assertEqual(hedging.hedger(first.settings).workers, 2)
+        self.assertIsNot(hedging.hedger(first.settings), hedger)
+
+    def test_global_compression(self):
+        self.stub.compression = True
+        turbasen.Sted.get(self.ids[0][0])
+        compressed = self.stub.bytes_sent
+
+        self.configure(COMPRESSION=False)
+        self.stub.reset_counters()
+        turbasen.Sted.get(self.ids[0][0])
+        self.assertLess(compressed, self.stub.bytes_sent)
+
+    def test_http2_session(self):
+        settings = turbasen.settings.copy_settings(HTTP2=True)
+        with mock.patch.object(transport, 'httpx') as httpx:
+            session = transport.create_session(settings)
+        self.assertEqual(httpx.Client.call_args[1]['http2'], True)
+
+        httpx.Client.return_value.request.return_value = types.SimpleNamespace(
+            status_code=404,
+            reason_phrase='Not Found',
+            headers={'ETag': '"1"', 'Content-Type': 'application/json'},
+            url='https://example.com/steder/1',
+            encoding='utf-8',
+            content=json.dumps({'message': 'Not found'}).encode('utf-8'),
+        )
+        response = session.get('https://example.com/steder/1', params={'fields': 'navn'})
+        httpx.Client.return_value.request.assert_called_once_with(
+            'GET',
+            'https://example.com/steder/1',
+            content=None,
+            params={'fields': 'navn'},
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.headers['etag'], '"1"')
+        self.assertEqual(response.json(), {'message': 'Not found'})
+        with self.assertRaises(requests.HTTPError):
+            response.raise_for_status()
+        with self.assertRaises(turbasen.exceptions.DocumentNotFound):
+            turbasen.Sted._handle_response(response, 'GET')
+
+    @unittest.skipIf(transport.httpx is not None, "httpx is installed")
+    def test_http2_unavailable(self):
+        with self.assertRaises(ImportError):
+            turbasen.TurbasenClient(HTTP2=True)
+
+class PickleCache(PermanentDictCache):
+    def set(self, key, value, duration):
+        super().set(key, pickle.dumps(value), duration)
+
+    def get(self, key):
+        value = super().get(key)
+        return pickle.loads(value) if value is not None else None
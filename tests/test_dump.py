@@ -0,0 +1,101 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from turbasen.__main__ import main
+from turbasen.dump import Dump
+import turbasen
+
+from .stub import StubTestCase
+from .test_cache import PermanentDictCache
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = self.stub.populate('turer', 120)
+        self.api = self.create_client()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def read(self, path):
+        with gzip.open(path, 'rt') if path.endswith('.gz') else open(path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_dump(self):
+        path = os.path.join(self.directory.name, 'turer.jsonl')
+        progress = io.StringIO()
+        dump = Dump(self.api.Tur, path, fields=['tags'], shard_size=50, processes=0,
+                    progress=progress)
+        self.assertEqual(dump.run(), 120)
+
+        documents = self.read(path)
+        self.assertEqual([document['_id'] for document in documents], self.ids)
+        self.assertEqual(documents[0]['tags'], ['Hytte'])
+        self.assertNotIn('beskrivelse', documents[0])
+        self.assertIn('Shard 3/3: 120 documents', progress.getvalue())
+        self.assertFalse(os.path.exists(path + '.parts'))
+
+    def test_processes_compressed(self):
+        path = os.path.join(self.directory.name, 'turer.jsonl.gz')
+        self.assertEqual(Dump(self.api.Tur, path, shard_size=50, processes=2,
+                              progress=None).run(), 120)
+        self.assertEqual([document['_id'] for document in self.read(path)], self.ids)
+
+    def test_resume(self):
+        path = os.path.join(self.directory.name, 'turer.jsonl.gz')
+        dump = Dump(self.api.Tur, path, shard_size=50, processes=0, progress=None)
+        dump.total = 120
+        dump.prepare()
+        with gzip.open(dump.part_path(0), 'wt') as part:
+            part.write('{"_id":"resumed"}\n')
+
+        self.stub.reset_counters()
+        resumed = Dump(self.api.Tur, path, shard_size=50, processes=0, resume=True,
+                       progress=None)
+        self.assertEqual(resumed.run(), 71)
+        # A count request, a page request for each of the two remaining shards and an empty page
+        # past the total
+        self.assertEqual(self.stub.requests, 4)
+        self.assertEqual(self.read(path)[0], {'_id': 'resumed'})
+
+    def test_command(self):
+        path = os.path.join(self.directory.name, 'turer.jsonl')
+        main([
+            '--endpoint-url', self.api.settings.ENDPOINT_URL,
+            'dump', 'turer', path,
+            '--param', 'status=Offentlig',
+            '--processes', '0',
+        ])
+        self.assertEqual(len(self.read(path)), 120)
+
+        with self.assertRaises(SystemExit):
+            main(['dump', 'unknown', path])
+        with self.assertRaises(SystemExit):
+            main([])
+
+    def test_fresh_total(self):
+        # A cached count doesn't limit the dump
+        client = self.create_client(CACHE=PermanentDictCache())
+        self.assertEqual(client.Tur.count(), 120)
+        self.stub.populate('turer', 5)
+
+        # Documents created after the total was counted are included
+        requests = []
+
+        def create_during_dump():
+            requests.append(None)
+            if len(requests) == 2:
+                self.stub.populate('turer', 5)
+
+        turbasen.handle_event('api.get_objects', create_during_dump)
+        self.addCleanup(turbasen.events.remove_handler, 'api.get_objects', create_during_dump)
+
+        path = os.path.join(self.directory.name, 'turer.jsonl')
+        dump = Dump(client.Tur, path, shard_size=50, workers=1, processes=0, progress=None)
+        self.assertEqual(dump.run(), 130)
+        self.assertEqual(dump.total, 125)
+        self.assertEqual(len(self.read(path)), 130)
+        # The count, a page for each of the first two shards and two for the last
+        self.assertEqual(len(requests), 5)
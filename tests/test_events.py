@@ -1,9 +1,15 @@
+import threading
 import unittest
 
-from turbasen.events import trigger
+from turbasen.events import flush, remove_handler, trigger
 import turbasen
 
 class TestClass(unittest.TestCase):
+    def handle_event(self, event, callback):
+        """Register a handler for the current test"""
+        turbasen.handle_event(event, callback)
+        self.addCleanup(remove_handler, event, callback)
+
     def test_custom_event(self):
         global mutable_list
         mutable_list = []
@@ -12,7 +18,7 @@ class TestClass(unittest.TestCase):
             mutable_list.append(1)
 
         trigger('foo')
-        turbasen.handle_event('foo', add_value_to_list)
+        self.handle_event('foo', add_value_to_list)
         trigger('foo')
         trigger('bar')
 
@@ -25,7 +31,86 @@ class TestClass(unittest.TestCase):
         def add_value_to_list():
             mutable_list.append(1)
 
-        turbasen.handle_event('api.get_object', add_value_to_list)
+        self.handle_event('api.get_object', add_value_to_list)
         turbasen.Sted.get('52407fb375049e561500004e')
 
         self.assertEqual(len(mutable_list), 1)
+
+    def test_remove_handler(self):
+        values = []
+        turbasen.handle_event('foo.remove', values.append)
+        trigger('foo.remove', 1)
+        remove_handler('foo.remove', values.append)
+        trigger('foo.remove', 2)
+        self.assertEqual(values, [1])
+
+        with self.assertRaises(ValueError):
+            remove_handler('foo.remove', values.append)
+
+    def test_timings(self):
+        def handler():
+            pass
+
+        turbasen.handle_event('foo.timings', handler)
+        trigger('foo.timings')
+        trigger('foo.timings')
+        self.assertEqual(turbasen.events.timings[('foo.timings', handler)]['calls'], 2)
+
+        # Removing the handler drops its timings, so the callback isn't kept alive
+        remove_handler('foo.timings', handler)
+        self.assertNotIn(('foo.timings', handler), turbasen.events.timings)
+
+    def test_async_dispatch(self):
+        values = []
+        thread_names = []
+
+        def handler(value):
+            values.append(value)
+            thread_names.append(threading.current_thread().name)
+
+        self.handle_event('foo.async', handler)
+        try:
+            turbasen.configure(EVENT_DISPATCH='async')
+            trigger('foo.async', 1)
+            trigger('foo.async', 2)
+            flush()
+        finally:
+            turbasen.configure(EVENT_DISPATCH='sync')
+
+        self.assertEqual(values, [1, 2])
+        self.assertNotIn(threading.current_thread().name, thread_names)
+
+    def test_async_dispatch_overflow(self):
+        values = []
+        started = threading.Event()
+        blocked = threading.Event()
+
+        def block():
+            started.set()
+            blocked.wait()
+
+        self.handle_event('foo.block', block)
+        self.handle_event('foo.overflow', values.append)
+        dispatcher = turbasen.events.Dispatcher(size=2)
+
+        def overflow(policy):
+            # Occupy the dispatcher thread, then put three events in a queue of size two
+            turbasen.configure(EVENT_OVERFLOW=policy)
+            values.clear()
+            started.clear()
+            blocked.clear()
+            dispatcher.put('foo.block', ())
+            started.wait()
+            for value in range(3):
+                dispatcher.put('foo.overflow', (value,))
+            blocked.set()
+            dispatcher.queue.join()
+            return list(values)
+
+        try:
+            self.assertEqual(overflow('drop_new'), [0, 1])
+            self.assertEqual(overflow('drop_old'), [1, 2])
+            self.assertEqual(dispatcher.dropped, 2)
+        finally:
+            blocked.set()
+            turbasen.configure(EVENT_OVERFLOW='drop_new')
@@ -0,0 +1,53 @@
+import unittest
+
+from turbasen.geometry import numpy
+import turbasen
+
+@unittest.skipIf(numpy is None, "NumPy not installed")
+class TestClass(unittest.TestCase):
+    def setUp(self):
+        self.tur = turbasen.Tur(_id='t1', _etag='"1"', navn='Testtur', geojson={
+            'type': 'LineString',
+            'coordinates': [
+                [10.0, 60.0, 100],
+                [10.0005, 60.00001, 150],
+                [10.001, 60.0, 120],
+                [10.001, 60.001, 200],
+            ],
+        })
+
+    def test_bbox(self):
+        self.assertEqual(self.tur.geometry().bbox(), (10.0, 60.0, 10.001, 60.001))
+
+    def test_length(self):
+        sted = turbasen.Sted(geojson={'type': 'Point', 'coordinates': [10.0, 60.0]})
+        self.assertEqual(sted.geometry().length(), 0)
+
+        # 0.001 degrees of latitude is about 111 meters
+        line = turbasen.Tur(geojson={'type': 'LineString', 'coordinates': [[10, 60], [10, 60.001]]})
+        self.assertAlmostEqual(line.geometry().length(), 111.19, places=1)
+
+    def test_elevation(self):
+        self.assertEqual(self.tur.geometry().elevation(), {
+            'min': 100,
+            'max': 200,
+            'ascent': 130,
+            'descent': 30,
+        })
+
+    def test_simplify(self):
+        geometry = self.tur.geometry()
+        simplified = geometry.simplify(5)
+        self.assertEqual(simplified.to_geojson()['coordinates'], [
+            [10.0, 60.0, 100],
+            [10.001, 60.0, 120],
+            [10.001, 60.001, 200],
+        ])
+        self.assertIs(geometry.simplify(5), simplified)
+        self.assertEqual(len(geometry.simplify(0.1).coordinates), 4)
+
+    def test_cached_by_etag(self):
+        geometry = self.tur.geometry()
+        self.assertIs(self.tur.geometry(), geometry)
+        self.tur._etag = '"2"'
+        self.assertIsNot(self.tur.geometry(), geometry)
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from turbasen import hedging
+
+from .stub import StubTestCase
+
+class SlowSession:
+    """Delays the first request after `slow` is set"""
+    def __init__(self, session, delay):
+        self.session = session
+        self.delay = delay
+        self.slow = threading.Event()
+
+    def get(self, url, **kwargs):
+        if self.slow.is_set():
+            self.slow.clear()
+            time.sleep(self.delay)
+        return self.session.get(url, **kwargs)
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = self.stub.populate('steder', 2)
+        self.api = self.create_client(HEDGE_PERCENTILE=90)
+        self.session = SlowSession(self.api.session, 1)
+        self.api.Sted.session = self.session
+        self.hedger = hedging.hedger(self.api.settings)
+
+        # Observe enough latencies to start hedging
+        for _ in range(hedging.Hedger.MIN_SAMPLES):
+            self.api.Sted.get(self.ids[0])
+
+    def test_hedged(self):
+        self.api.configure(HEDGE_RATIO=1)
+        self.session.slow.set()
+        start = time.perf_counter()
+        sted = self.api.Sted.get(self.ids[1])
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(sted['_id'], self.ids[1])
+        self.assertEqual(self.hedger.hedged, 1)
+
+    def test_ratio(self):
+        self.api.configure(HEDGE_RATIO=0)
+        self.session.slow.set()
+        start = time.perf_counter()
+        self.api.Sted.get(self.ids[1])
+        self.assertGreaterEqual(time.perf_counter() - start, 1)
+        self.assertEqual(self.hedger.hedged, 0)
+        self.assertEqual(self.hedger.requests, hedging.Hedger.MIN_SAMPLES + 1)
+
+    def test_disabled(self):
+        self.api.configure(HEDGE_PERCENTILE=None)
+        self.api.Sted.get(self.ids[1])
+        self.assertEqual(self.hedger.requests, hedging.Hedger.MIN_SAMPLES)
+
+    def test_concurrent(self):
+        # Requests beyond the pool's workers are sent on the callers' threads, not queued
+        self.api.configure(HEDGE_RATIO=1)
+        self.stub.latency = 0.2
+        threads = [
+            threading.Thread(target=self.api.Sted.get, args=(self.ids[1],))
+            for _ in range(self.api.settings.WORKERS * 3)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual(
+            self.hedger.requests,
+            hedging.Hedger.MIN_SAMPLES + self.api.settings.WORKERS * 3,
+        )
@@ -0,0 +1,73 @@
+import threading
+
+from turbasen import identity
+import turbasen
+
+from .stub import StubTestCase
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = self.stub.populate('steder', 3)
+        self.configure(IDENTITY_MAP=False)
+
+    def test_disabled(self):
+        self.assertIsNone(identity.current())
+        self.assertIsNot(turbasen.Sted.get(self.ids[0]), turbasen.Sted.get(self.ids[0]))
+
+    def test_global_map(self):
+        self.configure(IDENTITY_MAP=True)
+        self.assertIs(identity.current(), identity.global_map)
+        sted = turbasen.Sted.get(self.ids[0])
+        self.assertIs(turbasen.Sted.get(self.ids[0]), sted)
+        self.assertIs(turbasen.Sted.list()[0], sted)
+
+    def test_partial_upgraded(self):
+        with identity.scope() as identity_map:
+            partials = turbasen.Sted.list()
+            self.assertEqual(len(identity_map), 3)
+            self.assertTrue(partials[1]._is_partial)
+
+            # Getting the document upgrades the listed instance
+            self.stub.reset_counters()
+            sted = turbasen.Sted.get(self.ids[1])
+            self.assertIs(sted, partials[1])
+            self.assertFalse(partials[1]._is_partial)
+            self.assertEqual(partials[1]['beskrivelse'], 'x' * 16)
+            self.assertEqual(self.stub.requests, 1)
+
+            # Fetching a partial instance is shared too
+            partials[2]['beskrivelse']
+            self.assertIs(turbasen.Sted.list()[2], partials[2])
+            self.assertFalse(turbasen.Sted.list()[2]._is_partial)
+
+        self.assertIsNone(identity.current())
+
+    def test_changed_document_listed(self):
+        self.configure(IDENTITY_MAP=True)
+        sted = turbasen.Sted.get(self.ids[0])
+        document = self.stub.collections['steder'][self.ids[0]]
+        document = self.stub.store('steder', dict(document, navn='Endret'))
+
+        listed = turbasen.Sted.list()[0]
+        self.assertIs(listed, sted)
+        self.assertEqual(sted['navn'], 'Endret')
+        self.assertEqual(sted._etag, '"%s"' % document['checksum'])
+        self.assertTrue(sted._is_partial)
+        self.assertEqual(sted['beskrivelse'], 'x' * 16)
+
+    def test_weak_references(self):
+        with identity.scope() as identity_map:
+            turbasen.Sted.get(self.ids[0])
+            self.assertEqual(len(identity_map), 0)
+
+    def test_scope_per_thread(self):
+        maps = []
+        with identity.scope() as identity_map:
+            with identity.scope() as inner_map:
+                thread = threading.Thread(target=lambda: maps.append(identity.current()))
+                thread.start()
+                thread.join()
+                self.assertIs(identity.current(), inner_map)
+            self.assertIs(identity.current(), identity_map)
+        self.assertEqual(maps, [None])
@@ -0,0 +1,70 @@
+import os
+import tempfile
+from unittest import mock
+
+import requests
+
+from turbasen.media import MediaCache
+import turbasen
+
+from .stub import StubTestCase
+
+class TestClass(StubTestCase):
+    stub_options = {}
+
+    def setUp(self):
+        super().setUp()
+        self.stub.files = {'/img/1.jpg': b'small', '/img/2.jpg': b'large'}
+
+        self.bilde = turbasen.Bilde(_id='b1', _etag='"1"', navn='Testbilde', img=[
+            {'url': '%s/img/1.jpg' % self.endpoint_url, 'width': 150},
+            {'url': '%s/img/2.jpg' % self.endpoint_url, 'width': 1200},
+        ])
+        self.stub.store('bilder', dict(self.bilde.data))
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = MediaCache(self.directory.name)
+
+    def test_download(self):
+        paths = self.cache.download([self.bilde])
+        self.assertEqual(len(paths), 2)
+        with open(paths[self.bilde['img'][1]['url']], 'rb') as image:
+            self.assertEqual(image.read(), b'large')
+        self.assertEqual(self.stub.requests, 2)
+
+        # Cached files are used without requests, or revalidated when refreshing
+        self.assertEqual(self.cache.download([self.bilde]), paths)
+        self.assertEqual(self.stub.requests, 2)
+        self.stub.reset_counters()
+        self.assertEqual(self.cache.download([self.bilde], refresh=True), paths)
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(self.stub.bytes_sent, 0)
+
+    def test_checksum_path(self):
+        variant = dict(self.bilde['img'][0])
+        path = self.cache.path(variant)
+        self.assertTrue(path.endswith('.jpg'))
+        variant['checksum'] = 'abc'
+        self.assertNotEqual(path, self.cache.path(variant))
+
+    def test_prefetch(self):
+        sted = turbasen.Sted(navn='Testhytta', bilder=['b1'])
+        paths = self.cache.prefetch([sted])
+        self.assertEqual(sorted(paths), sorted(variant['url'] for variant in self.bilde['img']))
+        self.assertTrue(all(os.path.exists(path) for path in paths.values()))
+
+    def test_failed_download(self):
+        def iter_content(chunk_size):
+            yield b'partial'
+            raise requests.exceptions.ChunkedEncodingError()
+
+        with mock.patch.object(requests.Response, 'iter_content', side_effect=iter_content):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                self.cache.fetch(self.bilde['img'][0])
+        self.assertEqual(os.listdir(os.path.dirname(self.cache.path(self.bilde['img'][0]))), [])
+
+    def test_client_settings(self):
+        client = self.create_client(WORKERS=2)
+        cache = MediaCache(self.directory.name, client.settings)
+        self.assertEqual(cache.session.get_adapter(self.endpoint_url)._pool_maxsize, 2)
+        self.assertEqual(len(cache.download([self.bilde])), 2)
@@ -0,0 +1,42 @@
+from turbasen import projection
+import turbasen
+
+from .stub import StubTestCase
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stub.populate('steder', 5)
+        projection.reset()
+        self.addCleanup(projection.reset)
+        self.configure(FIELD_PROFILING=False, AUTO_FIELDS=False)
+
+    def test_field_profiling(self):
+        self.configure(FIELD_PROFILING=True)
+        for sted in turbasen.Sted.list():
+            sted['beskrivelse']
+        report = projection.report()
+        self.assertEqual(list(report), ['steder'])
+        self.assertEqual(report['steder']['beskrivelse']['fetches'], 5)
+        call_site, = report['steder']['beskrivelse']['call_sites']
+        self.assertIn('test_projection.py', call_site)
+        self.assertEqual(projection.suggested_fields(turbasen.Sted), ['beskrivelse'])
+        self.assertEqual(projection.suggested_fields(turbasen.Tur), [])
+
+    def test_auto_fields(self):
+        self.configure(AUTO_FIELDS=True)
+        turbasen.Sted.list()[0]['beskrivelse']
+
+        self.stub.reset_counters()
+        for sted in turbasen.Sted.list():
+            self.assertEqual(sted['beskrivelse'], 'x' * 16)
+            self.assertTrue(sted._is_partial)
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_non_field_keys(self):
+        self.configure(AUTO_FIELDS=True)
+        partial = turbasen.Sted.list()[0]
+        with self.assertRaises(KeyError):
+            partial[0]
+        self.assertEqual(projection.suggested_fields(turbasen.Sted), [])
+        self.assertEqual(len(turbasen.Sted.list()), 5)
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+import time
+
+from turbasen.refresh import RefreshAhead
+
+from .stub import StubTestCase
+from .test_cache import PermanentDictCache
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = self.stub.populate('steder', 3)
+        self.api = self.create_client(CACHE=PermanentDictCache(), ETAG_CACHE_PERIOD=600)
+        self.refresh_ahead = RefreshAhead(interval=60)
+        self.refresh_ahead.start()
+        self.addCleanup(self.refresh_ahead.stop)
+
+    def test_refresh_object(self):
+        Sted = self.api.Sted
+        for _ in range(2):
+            sted = Sted.get(self.ids[0])
+        Sted.get(self.ids[1])
+
+        # Nothing is about to go stale
+        self.stub.reset_counters()
+        self.assertEqual(self.refresh_ahead.refresh(), 0)
+
+        # Only the popular object is revalidated before its ETag goes stale
+        for _ in range(4):
+            Sted.get(self.ids[0])
+        Sted.get(self.ids[1])
+        for object_id in self.ids[:2]:
+            Sted._get_local(object_id)._saved = datetime.now() - timedelta(seconds=590)
+        self.stub.reset_counters()
+        self.assertEqual(self.refresh_ahead.refresh(), 1)
+        self.assertEqual(self.stub.requests, 1)
+        self.assertLess(datetime.now() - Sted._get_local(self.ids[0])._saved, timedelta(seconds=1))
+
+        # Revalidated objects are used without a request
+        self.assertEqual(Sted.get(self.ids[0]), sted)
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_refresh_list(self):
+        for _ in range(4):
+            self.api.Sted.list(params={'tags': 'Hytte'})
+
+        # A list that was just loaded isn't refreshed
+        self.stub.reset_counters()
+        self.assertEqual(self.refresh_ahead.refresh(), 0)
+        self.assertEqual(self.stub.requests, 0)
+
+        # It's refreshed when about to go stale
+        entry, = self.refresh_ahead.lists.values()
+        entry['refreshed'] = time.monotonic() - self.api.settings.CACHE_LOOKUP_PERIOD + 30
+        self.api.settings.CACHE.keys.clear()
+        self.assertEqual(self.refresh_ahead.refresh(), 1)
+        self.assertEqual(self.stub.requests, 1)
+
+        # The refreshed list is cached
+        self.assertEqual(len(self.api.Sted.list(params={'tags': 'Hytte'})), 3)
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_warm(self):
+        RefreshAhead(collections=[self.api.Sted]).warm()
+        self.stub.reset_counters()
+        self.api.Sted.get(self.ids[2])
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_stop(self):
+        refresh_ahead = RefreshAhead()
+        refresh_ahead.stop()
+        refresh_ahead.start()
+        refresh_ahead.stop()
+        refresh_ahead.stop()
+        self.assertIsNone(refresh_ahead.thread)
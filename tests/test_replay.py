@@ -0,0 +1,80 @@
+import os
+import tempfile
+import time
+
+from turbasen.replay import RecordingSession, ReplaySession
+import turbasen
+
+from .stub import StubTestCase
+from .test_cache import PermanentDictCache
+
+class TestClass(StubTestCase):
+    stub_options = {'payload_size': 16, 'latency': 0.05}
+
+    def setUp(self):
+        super().setUp()
+        self.ids = self.stub.populate('steder', 25)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'traffic.jsonl.gz')
+
+        # Record lists, document retrievals and an ETag revalidation, with a pause before the
+        # retrievals
+        client = self.create_client(
+            session=RecordingSession(self.path),
+            API_KEY='secret',
+            CACHE=PermanentDictCache(),
+            ETAG_CACHE_PERIOD=0,
+        )
+        self.objects = client.Sted.list()
+        time.sleep(0.2)
+        client.Sted.get(self.ids[0])
+        client.Sted.get(self.ids[0])
+        client.close()
+
+    def replay(self, **kwargs):
+        return turbasen.TurbasenClient(
+            session=ReplaySession(self.path, **kwargs),
+            ENDPOINT_URL='http://replay.invalid',
+            CACHE=PermanentDictCache(),
+            ETAG_CACHE_PERIOD=0,
+            LIMIT=20,
+        )
+
+    def test_replay(self):
+        client = self.replay()
+        self.assertEqual(len(client.session), 4)
+
+        start = time.perf_counter()
+        self.assertEqual(
+            [object.data for object in client.Sted.list()],
+            [object.data for object in self.objects],
+        )
+        sted = client.Sted.get(self.ids[0])
+        self.assertEqual(sted['navn'], 'steder 0')
+
+        # The recorded 304 response is replayed for the conditional request
+        self.assertEqual(client.Sted.get(self.ids[0])._etag, sted._etag)
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+        with self.assertRaises(LookupError):
+            client.Sted.get(self.ids[1])
+
+    def test_timing(self):
+        client = self.replay(speed=2)
+        start = time.perf_counter()
+        client.Sted.get(self.ids[0])
+        self.assertGreaterEqual(time.perf_counter() - start, 0.025)
+
+    def test_gaps(self):
+        # The retrieval isn't answered before the pause in the recording has passed
+        client = self.replay(speed=2)
+        start = time.perf_counter()
+        client.Sted.list()
+        self.assertLess(time.perf_counter() - start, 0.1)
+        client.Sted.get(self.ids[0])
+        self.assertGreaterEqual(time.perf_counter() - start, 0.15)
+
+    def test_no_api_key(self):
+        with open(self.path, 'rb') as recording:
+            self.assertNotIn(b'secret', recording.read())
@@ -0,0 +1,45 @@
+import unittest
+
+from turbasen.search import SearchIndex, fold, tokenize
+import turbasen
+
+class TestClass(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.steder = [
+            turbasen.Sted(_id='1', navn='Skåpet', beskrivelse='Hytte ved Gjende', tags=['Hytte']),
+            turbasen.Sted(_id='2', navn='Gjendebu', beskrivelse='Ved vannet', tags=['Hytte']),
+            turbasen.Sted(_id='3', navn='Fjellstue', beskrivelse='Nær Skåbu', tags=['Fjellstue']),
+        ]
+        for sted in self.steder:
+            self.index.add(sted)
+
+    def test_fold(self):
+        self.assertEqual(fold('Kåfjorddalen Ærøy Øvre Café'), 'kafjorddalen aeroy ovre cafe')
+        self.assertEqual(tokenize('Gjende, Øvre-Grue'), ['gjende', 'ovre', 'grue'])
+
+    def test_search(self):
+        self.assertEqual(self.index.search('gjende'), [self.steder[1], self.steder[0]])
+        self.assertEqual(self.index.search('ska'), [self.steder[0], self.steder[2]])
+        self.assertEqual(self.index.search('SKÅ hytte'), [self.steder[0]])
+        self.assertEqual(self.index.search('hytte', limit=1), [self.steder[1]])
+        self.assertEqual(self.index.search('gjende', collection=turbasen.Tur), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_update_and_remove(self):
+        self.steder[0]['navn'] = 'Skarvet'
+        self.index.add(self.steder[0])
+        self.assertEqual(self.index.search('skap'), [])
+        self.assertEqual(self.index.search('skarv'), [self.steder[0]])
+
+        self.index.remove(self.steder[0])
+        self.assertEqual(self.index.search('skarv'), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_watch(self):
+        self.index.watch()
+        self.addCleanup(self.index.unwatch)
+        sted = turbasen.Sted(_id='4', _etag='"1"', navn='Ny hytte')
+        self.assertEqual(self.index.search('ny'), [sted])
+        turbasen.Sted(_id='5', _is_partial=True, navn='Ny partial')
+        self.assertEqual(self.index.search('ny'), [sted])
@@ -0,0 +1,41 @@
+import os
+import tempfile
+
+from turbasen import snapshot
+import turbasen
+
+from .stub import StubTestCase
+from .test_cache import PermanentDictCache
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = self.stub.populate('steder', 25)
+        self.stub.populate('turer', 5)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def dump_and_load(self, filename):
+        path = os.path.join(self.directory.name, filename)
+        self.assertEqual(snapshot.dump([turbasen.Sted, turbasen.Tur], path), 30)
+
+        self.configure(CACHE=PermanentDictCache())
+        self.assertEqual(snapshot.load(path), 30)
+
+        self.stub.reset_counters()
+        sted = turbasen.Sted.get(self.ids[0])
+        self.assertEqual(sted['navn'], 'steder 0')
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_dump_load(self):
+        self.dump_and_load('snapshot.txt')
+
+    def test_dump_load_gzip(self):
+        self.dump_and_load('snapshot.txt.gz')
+
+    def test_load_invalid(self):
+        path = os.path.join(self.directory.name, 'invalid.txt')
+        with open(path, 'w') as invalid:
+            invalid.write('foo\n')
+        with self.assertRaises(ValueError):
+            snapshot.load(path)
@@ -0,0 +1,65 @@
+import mmap
+import os
+import tempfile
+from unittest import mock
+
+from turbasen import snapshot
+from turbasen.store import SnapshotStore
+import turbasen
+
+from .stub import StubTestCase
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = self.stub.populate('steder', 10)
+        self.tur_id = self.stub.populate('turer', 1)[0]
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'snapshot.txt')
+        snapshot.dump([turbasen.Sted, turbasen.Tur], self.path)
+        self.store = SnapshotStore(self.path)
+        self.addCleanup(self.store.close)
+        self.configure(STORE=None)
+
+    def test_store_get(self):
+        self.assertEqual(len(self.store), 11)
+        sted = self.store.get(turbasen.Sted, self.ids[3])
+        self.assertEqual(sted['navn'], 'steder 3')
+        self.assertIsInstance(sted, turbasen.Sted)
+        self.assertFalse(sted._is_partial)
+        self.assertIsNone(self.store.get(turbasen.Sted, 'foo'))
+        self.assertIsNone(self.store.get(turbasen.Sted, self.tur_id))
+
+    def test_get_from_store(self):
+        self.configure(STORE=self.store)
+        self.stub.reset_counters()
+        self.assertEqual(turbasen.Sted.get(self.ids[0])['navn'], 'steder 0')
+
+        partial = turbasen.Sted(_is_partial=True, _id=self.ids[1])
+        self.assertEqual(partial['beskrivelse'], 'x' * 16)
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_get_from_store_revalidated(self):
+        self.configure(STORE=self.store, ETAG_CACHE_PERIOD=0)
+        self.stub.reset_counters()
+        self.assertEqual(turbasen.Sted.get(self.ids[0])['navn'], 'steder 0')
+        self.assertEqual(self.stub.requests, 1)
+        self.assertEqual(self.stub.bytes_sent, 0)
+
+    def test_invalid_store(self):
+        path = os.path.join(self.directory.name, 'invalid.txt')
+        with open(path, 'w') as invalid:
+            invalid.write('foo\n')
+        maps = []
+        mmap_class = mmap.mmap
+
+        def create_map(*args, **kwargs):
+            maps.append(mmap_class(*args, **kwargs))
+            return maps[-1]
+
+        with mock.patch('turbasen.store.mmap.mmap', side_effect=create_map):
+            with self.assertRaises(ValueError):
+                SnapshotStore(path)
+        self.assertTrue(maps[0].closed)
@@ -0,0 +1,89 @@
+from turbasen.sync import ChangeFeed, reconcile
+import turbasen
+
+from .stub import StubTestCase
+from .test_cache import PermanentDictCache
+
+class TestClass(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = self.stub.populate('steder', 30)
+
+    def test_reconcile(self):
+        local_store = {}
+        changes = reconcile(turbasen.Sted, local_store)
+        self.assertEqual(sorted(changes.created), self.ids)
+        self.assertEqual(changes.updated, [])
+        self.assertEqual(changes.deleted, [])
+        self.assertEqual(len(local_store), 30)
+        self.assertFalse(local_store[self.ids[0]]._is_partial)
+
+        # Nothing changed; only the id/checksum pages are requested
+        self.stub.reset_counters()
+        self.assertEqual(reconcile(turbasen.Sted, local_store), ([], [], []))
+        self.assertEqual(self.stub.requests, 2)
+
+        collection = self.stub.collections['steder']
+        self.stub.store('steder', dict(collection[self.ids[0]], navn='Endret'))
+        del collection[self.ids[1]]
+        changes = reconcile(turbasen.Sted, local_store)
+        self.assertEqual(changes, ([], [self.ids[0]], [self.ids[1]]))
+        self.assertEqual(local_store[self.ids[0]]['navn'], 'Endret')
+        self.assertNotIn(self.ids[1], local_store)
+
+    def test_reconcile_lists(self):
+        # Cached lists are only invalidated when the server changed
+        self.configure(CACHE=PermanentDictCache())
+        objects = turbasen.Sted.list()
+        reconcile(turbasen.Sted, {})
+        reconcile(turbasen.Sted, {})
+        self.stub.reset_counters()
+        self.assertEqual(turbasen.Sted.list(), objects)
+        self.assertEqual(self.stub.requests, 0)
+
+        # The id/checksum pages aren't cached, so a changed document takes one request for each
+        # page and one for the document
+        collection = self.stub.collections['steder']
+        self.stub.store('steder', dict(collection[self.ids[0]], navn='Endret'))
+        local_store = {object['_id']: object for object in objects}
+        self.stub.reset_counters()
+        self.assertEqual(reconcile(turbasen.Sted, local_store).updated, [self.ids[0]])
+        self.assertEqual(self.stub.requests, 3)
+        self.stub.reset_counters()
+        self.assertEqual(turbasen.Sted.list()[0]['navn'], 'Endret')
+        # Both cached pages are revalidated by checksums, and the changed one retrieved again
+        self.assertEqual(self.stub.requests, 3)
+
+    def test_change_feed(self):
+        changes = []
+        for event in ['document.created', 'document.updated', 'document.deleted']:
+            turbasen.handle_event(event, lambda object, event=event: changes.append((
+                event,
+                object['_id'],
+            )))
+
+        try:
+            feed = ChangeFeed()
+            feed.watch(turbasen.Sted)
+            feed.watch(turbasen.Sted)
+
+            # The first poll only lists ids and checksums
+            self.stub.reset_counters()
+            feed.poll()
+            self.assertEqual(changes, [])
+            self.assertEqual(self.stub.requests, 2)
+            self.assertEqual(len(feed.get_objects(turbasen.Sted)), 30)
+
+            collection = self.stub.collections['steder']
+            self.stub.store('steder', dict(collection[self.ids[0]], navn='Endret'))
+            del collection[self.ids[1]]
+            created = self.stub.populate('steder', 1)[-1]
+            feed.poll()
+            self.assertEqual(changes, [
+                ('document.created', created),
+                ('document.updated', self.ids[0]),
+                ('document.deleted', self.ids[1]),
+            ])
+        finally:
+            for event in ['document.created', 'document.updated', 'document.deleted']:
+                turbasen.events.handlers.pop(event)
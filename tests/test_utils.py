@@ -1,6 +1,6 @@
 import unittest
 
-from turbasen.util import params_to_dotnotation
+from turbasen.util import params_to_cache_key, params_to_dotnotation
 
 class TestClass(unittest.TestCase):
     def test_params_to_dotnotation(self):
@@ -27,3 +27,20 @@ class TestClass(unittest.TestCase):
             'jkl': 'mno',
         }
         self.assertEqual(params_to_dotnotation(test_dict), expected_result)
+
+    def test_params_to_cache_key(self):
+        key = params_to_cache_key({'tags': 'Hytte', 'fields': ['navn', 'beskrivelse']})
+        self.assertEqual(
+            key,
+            params_to_cache_key({'fields': ['beskrivelse', 'navn'], 'tags': 'Hytte'}),
+        )
+        self.assertNotEqual(key, params_to_cache_key({'tags': 'Hytte'}))
+        self.assertEqual(key, params_to_cache_key({'tags': 'Hytte', 'fields': 'navn,beskrivelse'}))
+        self.assertEqual(len(key), 40)
+
+    def test_params_to_cache_key_unhashable_values(self):
+        key = params_to_cache_key({'tags': ['Hytte', 'Turisthytte'], 'grupper': {'$in': [1]}})
+        self.assertEqual(key, params_to_cache_key({
+            'grupper': {'$in': [1]},
+            'tags': ['Hytte', 'Turisthytte'],
+        }))
@@ -13,3 +13,6 @@ from .settings import configure # noqa
 
 # Make handle_event available directly available through the root module
 from .events import handle_event # noqa
+
+# Make the client class available directly through the root module
+from .client import TurbasenClient # noqa
@@ -0,0 +1,92 @@
+"""
+Command line interface for bulk operations. Usage:
+
+    python -m turbasen dump turer turer.jsonl.gz [--fields navn,beskrivelse] [--param tags=Hytte]
+                                                 [--shard-size 1000] [--workers 8] [--processes 4]
+                                                 [--resume]
+
+The endpoint and API key are read from the ENDPOINT_URL and API_KEY environment variables unless
+given as options.
+"""
+import argparse
+import sys
+
+from .client import TurbasenClient
+from .dump import Dump
+from .settings import Settings
+
+def dump(args):
+    client = TurbasenClient(
+        ENDPOINT_URL=args.endpoint_url,
+        API_KEY=args.api_key,
+        WORKERS=args.workers,
+    )
+    if args.collection not in client.datatypes:
+        sys.exit("Unknown collection '%s'; choose from: %s" % (
+            args.collection,
+            ', '.join(sorted(client.datatypes)),
+        ))
+
+    params = dict(param.split('=', 1) for param in args.param)
+    fields = [field for field in args.fields.split(',') if field]
+    try:
+        Dump(
+            client.datatypes[args.collection],
+            args.path,
+            params=params,
+            fields=fields,
+            shard_size=args.shard_size,
+            workers=args.workers,
+            processes=args.processes,
+            resume=args.resume,
+        ).run()
+    finally:
+        client.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m turbasen', description="Turbasen client")
+    parser.add_argument('--endpoint-url', default=Settings.ENDPOINT_URL)
+    parser.add_argument('--api-key', default=Settings.API_KEY)
+    commands = parser.add_subparsers(dest='command')
+
+    dump_parser = commands.add_parser(
+        'dump',
+        help="Dump a collection to an NDJSON file",
+        description="Dump a collection to an NDJSON file, gzip compressed if the path ends with "
+        ".gz. Progress and throughput are written to stderr.",
+    )
+    dump_parser.add_argument('collection', help="Collection identifier, e.g. turer")
+    dump_parser.add_argument('path', help="Output file")
+    dump_parser.add_argument('--fields', default='', help="Comma-separated fields to include")
+    dump_parser.add_argument(
+        '--param',
+        action='append',
+        default=[],
+        metavar='KEY=VALUE',
+        help="API filter parameter; may be repeated",
+    )
+    dump_parser.add_argument('--shard-size', type=int, default=1000, help="Documents per shard")
+    dump_parser.add_argument('--workers', type=int, default=8, help="Concurrent downloads")
+    dump_parser.add_argument(
+        '--processes',
+        type=int,
+        default=None,
+        help="Processes encoding documents; 0 to encode in the downloading threads (default: "
+        "number of CPUs)",
+    )
+    dump_parser.add_argument(
+        '--resume',
+        action='store_true',
+        help="Keep the shards already written by an interrupted dump",
+    )
+    dump_parser.set_defaults(function=dump)
+
+    args = parser.parse_args(argv)
+    # Subcommands can only be required with Python 3.7 and newer
+    if args.command is None:
+        parser.error("a command is required: %s" % ', '.join(commands.choices))
+    args.function(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,34 @@
 from collections import UserDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from json.decoder import JSONDecodeError
+from uuid import uuid4
+import hashlib
 import json
 import logging
 
-import requests
-
 from .exceptions import DocumentNotFound, Unauthorized, InvalidDocument, ServerError
 from .settings import Settings
-from .util import params_to_dotnotation
-from . import events
+from .util import params_to_cache_key, params_to_dotnotation
+from . import events, hedging, identity, projection, transport
 
 logger = logging.getLogger('turbasen')
 
 class NTBObject(UserDict):
     """Base class for Turbasen datatypes. Subclasses must define the `identifier` attribute.
     NTBObject subclasses UserDict in order to act as a collection for document fields."""
-    def __init__(self, _is_partial=False, _etag=None, **fields):
+
+    # The settings and HTTP session used by the datatype. Datatypes bound to a `TurbasenClient`
+    # override these with the client's own, and refer to the client and their unbound datatype.
+    settings = Settings
+    session = transport.SettingsSession(Settings)
+    client = None
+    _unbound = None
+
+    def __init__(self, _is_partial=False, _etag=None, _saved=None, **fields):
         super().__init__(self)
         self._is_partial = _is_partial
-        self._set_fields(_etag, fields)
+        self._set_fields(_etag, fields, _saved)
 
     def __repr__(self):
         return '<%s: %s%s: %s>' % (
@@ -29,6 +38,19 @@ class NTBObject(UserDict):
             self.get_field('navn', '?'),
         )
 
+    def __reduce_ex__(self, protocol):
+        """Datatypes bound to a client are created at runtime and can't be pickled by reference, so
+        their objects are pickled as objects of the unbound datatype"""
+        if self.client is None:
+            return super().__reduce_ex__(protocol)
+        return (NTBObject._unpickle, (self._unbound, self.__dict__))
+
+    @staticmethod
+    def _unpickle(datatype, state):
+        object = datatype.__new__(datatype)
+        object.__dict__.update(state)
+        return object
+
     def __eq__(self, other):
         """Object equality relies on the object id being defined, and equal"""
         if type(self) != type(other):
@@ -51,10 +73,13 @@ class NTBObject(UserDict):
         except KeyError:
             # If the key is missing on a partial object; fetch all fields and retry
             if self._is_partial and '_id' in self:
-                logger.debug("[getitem %r.%s]: KeyError on partial object; fetching document" % (
+                logger.debug(
+                    "[getitem %r.%s]: KeyError on partial object; fetching document",
                     self,
                     key,
-                ))
+                )
+                if self.settings.FIELD_PROFILING or self.settings.AUTO_FIELDS:
+                    projection.record(self, key)
                 self._fetch()
                 return self[key]
             else:
@@ -64,15 +89,23 @@ class NTBObject(UserDict):
         """Renamed accessor for `dict.get`, because `get` is already in use in our subclass"""
         return self.data.get(*args, **kwargs)
 
-    def _set_fields(self, etag, fields):
-        """Assign a dict of fields on this object, along with an optional etag"""
+    def _set_fields(self, etag, fields, saved=None):
+        """Assign a dict of fields on this object, along with an optional etag and the time the
+        fields were retrieved, which defaults to now"""
         self._etag = etag
-        self._saved = datetime.now()
+        self._saved = saved if saved is not None else datetime.now()
+        self._references = {}
         self.update(fields)
 
         if '_id' in self and self._etag is not None and not self._is_partial:
-            Settings.CACHE.set('turbasen.object.%s' % self['_id'], self, Settings.CACHE_GET_PERIOD)
-            logger.debug("[_set_fields %r]: Saved and cached with ETag: %s" % (self, self._etag))
+            self.settings.CACHE.set(
+                self._cache_key('object.%s' % self['_id']),
+                self,
+                self.settings.CACHE_GET_PERIOD,
+            )
+            logger.debug("[_set_fields %r]: Saved and cached with ETag: %s", self, self._etag)
+
+        events.trigger('object.fields_set', self)
 
     #
     # Object instance handling
@@ -83,46 +116,52 @@ class NTBObject(UserDict):
         assert '_id' in self
         assert self._is_partial
 
-        object = Settings.CACHE.get('turbasen.object.%s' % self['_id'])
+        object = type(self)._get_local(self['_id'])
         if object is None:
-            logger.debug("[_fetch %r]: Not in local cache, retrieving document" % self)
-            headers, document = NTBObject._get_document(self.identifier, self['_id'])
+            logger.debug("[_fetch %r]: Not in local cache, retrieving document", self)
+            headers, document = self._get_document(self['_id'])
             self._is_partial = False
             self._set_fields(etag=headers['etag'], fields=document)
         else:
-            logger.debug("[_fetch %r]: Retrieved cached object, updating and refreshing" % self)
+            logger.debug("[_fetch %r]: Retrieved cached object, updating and refreshing", self)
             self._is_partial = False
-            self._set_fields(etag=object._etag, fields=object.items())
+            self._set_fields(etag=object._etag, fields=object.items(), saved=object._saved)
             self._refresh()
 
-    def _refresh(self):
-        """Based on object age, perform an ETag check, re-retrieving fields if object is modified"""
+    def _refresh(self, force=False):
+        """Based on object age, perform an ETag check, re-retrieving fields if object is modified.
+        With `force`, the ETag is checked regardless of the object age."""
         assert '_id' in self
         assert not self._is_partial
 
         object_age = datetime.now() - self._saved
-        etag_expiry = timedelta(seconds=Settings.ETAG_CACHE_PERIOD)
-        if self._etag is not None and object_age < etag_expiry:
+        etag_expiry = timedelta(seconds=self.settings.ETAG_CACHE_PERIOD)
+        if not force and self._etag is not None and object_age < etag_expiry:
             logger.debug(
                 "[_refresh %r]: Object age (%s) is less than ETag cache period (%s), skipping ETag "
-                "check" % (
-                    self,
-                    object_age,
-                    etag_expiry,
-                )
+                "check",
+                self,
+                object_age,
+                etag_expiry,
             )
             return
 
-        logger.debug("[_refresh %r]: ETag cache expired, retrieving document" % self)
-        result = NTBObject._get_document(self.identifier, self['_id'], self._etag)
+        logger.debug("[_refresh %r]: ETag cache expired, retrieving document", self)
+        result = self._get_document(self['_id'], self._etag)
         if result is None:
-            # Document is not modified, reset the etag check timeout
-            logger.debug("[_refresh %r]: Document was not modified" % self)
+            # Document is not modified, reset the etag check timeout. Referenced documents may
+            # have changed, so resolve them again.
+            logger.debug("[_refresh %r]: Document was not modified", self)
             self._saved = datetime.now()
-            Settings.CACHE.set('turbasen.object.%s' % self['_id'], self, Settings.CACHE_GET_PERIOD)
+            self._references = {}
+            self.settings.CACHE.set(
+                self._cache_key('object.%s' % self['_id']),
+                self,
+                self.settings.CACHE_GET_PERIOD,
+            )
         else:
             # Document was modified, set new etag and fields
-            logger.debug("[_refresh %r]: Document was modified, resetting fields" % self)
+            logger.debug("[_refresh %r]: Document was modified, resetting fields", self)
             headers, document = result
             self._set_fields(etag=headers['etag'], fields=document)
 
@@ -141,28 +180,31 @@ class NTBObject(UserDict):
         # Note that we're resetting all fields here. The main reason is to reset the etag and update
         # metadata fields, and although all other fields are reset, they should return as they were.
         self._set_fields(etag="\"%s\"" % document['checksum'], fields=document)
+        self._invalidate_lists()
 
     def delete(self):
         assert '_id' in self
 
-        params = {'api_key': Settings.API_KEY}
+        params = {'api_key': self.settings.API_KEY}
         events.trigger('api.delete_object')
-        request = requests.delete(
-            '%s/%s/%s' % (Settings.ENDPOINT_URL, self.identifier, self['_id']),
+        request = self.session.delete(
+            '%s/%s/%s' % (self.settings.ENDPOINT_URL, self.identifier, self['_id']),
             params=params,
         )
         NTBObject._handle_response(request, 'DELETE')
-        Settings.CACHE.delete('turbasen.object.%s' % self['_id'])
+        self.settings.CACHE.delete(self._cache_key('object.%s' % self['_id']))
+        self._invalidate_lists()
+        events.trigger('object.deleted', self)
         del self['_id']
         return request.headers
 
     def _post(self):
         assert not self._is_partial
 
-        params = {'api_key': Settings.API_KEY}
+        params = {'api_key': self.settings.API_KEY}
         events.trigger('api.post_object')
-        request = requests.post(
-            '%s/%s' % (Settings.ENDPOINT_URL, self.identifier),
+        request = self.session.post(
+            '%s/%s' % (self.settings.ENDPOINT_URL, self.identifier),
             headers={'Content-Type': 'application/json; charset=utf-8'},
             params=params,
             data=json.dumps(self.data),
@@ -174,10 +216,10 @@ class NTBObject(UserDict):
         assert '_id' in self
         assert not self._is_partial
 
-        params = {'api_key': Settings.API_KEY}
+        params = {'api_key': self.settings.API_KEY}
         events.trigger('api.put_object')
-        request = requests.put(
-            '%s/%s/%s' % (Settings.ENDPOINT_URL, self.identifier, self['_id']),
+        request = self.session.put(
+            '%s/%s/%s' % (self.settings.ENDPOINT_URL, self.identifier, self['_id']),
             headers={'Content-Type': 'application/json; charset=utf-8'},
             params=params,
             data=json.dumps(self.data),
@@ -188,10 +230,10 @@ class NTBObject(UserDict):
     def _patch(self):
         assert '_id' in self
 
-        params = {'api_key': Settings.API_KEY}
+        params = {'api_key': self.settings.API_KEY}
         events.trigger('api.patch_object')
-        request = requests.patch(
-            '%s/%s/%s' % (Settings.ENDPOINT_URL, self.identifier, self['_id']),
+        request = self.session.patch(
+            '%s/%s/%s' % (self.settings.ENDPOINT_URL, self.identifier, self['_id']),
             headers={'Content-Type': 'application/json; charset=utf-8'},
             params=params,
             data=json.dumps(self.data),
@@ -199,45 +241,168 @@ class NTBObject(UserDict):
         NTBObject._handle_response(request, 'PATCH')
         return request.headers, request.json()['document']
 
+    #
+    # Document references
+    #
+
+    def references(self, field):
+        """Return the documents referenced by id in the given field (e.g. 'steder' or 'bilder') as
+        objects of the datatype with the same identifier. Documents that no longer exist are
+        omitted. References resolved by `prefetch` are reused, but like objects from `get` they're
+        replaced by newer cached versions and ETag checked when the ETag cache period expires."""
+        if field not in self._references:
+            self._prefetch([self], [field])
+
+        references = []
+        for reference in self._references[field]:
+            try:
+                references.append(reference._revalidated())
+            except DocumentNotFound:
+                logger.debug("[references %r]: Referenced document %r not found", self, reference)
+        self._references[field] = references
+        return references
+
+    def _revalidated(self):
+        """Return the current version of this object: the cached object if the cache has another
+        version, refreshed if its ETag cache period has expired"""
+        object = type(self)._get_local(self['_id'])
+        if object is None or object._etag == self._etag:
+            object = self
+        object._refresh()
+        return identity.merge(object)
+
+    def _reference_ids(self, field):
+        """Return the object ids referenced in the given field, which may hold a single id or a list
+        of ids or documents"""
+        try:
+            references = self[field]
+        except KeyError:
+            return []
+
+        if type(references) != list:
+            references = [references]
+        return [
+            reference['_id'] if isinstance(reference, dict) else reference
+            for reference in references
+        ]
+
+    @classmethod
+    def _datatype(cls, identifier):
+        """Return the datatype class with the given identifier, bound to the same client as this
+        datatype if any"""
+        if cls.client is not None and identifier in cls.client.datatypes:
+            return cls.client.datatypes[identifier]
+
+        subclasses = NTBObject.__subclasses__()
+        while subclasses:
+            datatype = subclasses.pop(0)
+            if datatype.client is None and getattr(datatype, 'identifier', None) == identifier:
+                return datatype
+            subclasses.extend(datatype.__subclasses__())
+        raise ValueError("No datatype has the identifier '%s'" % identifier)
+
+    @classmethod
+    def _prefetch(cls, objects, fields):
+        """Resolve the references in the given fields for all objects. Referenced ids are collected
+        across all objects and deduplicated, and then retrieved concurrently through `get`, which
+        uses the object cache."""
+        references = set()
+        for field in fields:
+            datatype = cls._datatype(field)
+            for object in objects:
+                references.update((datatype, id) for id in object._reference_ids(field))
+
+        def get_reference(reference):
+            datatype, object_id = reference
+            try:
+                return reference, datatype.get(object_id)
+            except DocumentNotFound:
+                logger.debug("[_prefetch %s/%s]: Referenced document not found", *reference)
+                return reference, None
+
+        with ThreadPoolExecutor(max_workers=cls.settings.WORKERS) as executor:
+            resolved = dict(executor.map(get_reference, references))
+
+        for field in fields:
+            datatype = cls._datatype(field)
+            for object in objects:
+                object._references[field] = [
+                    resolved[(datatype, id)]
+                    for id in object._reference_ids(field)
+                    if resolved[(datatype, id)] is not None
+                ]
+
     #
     # Single document lookup
     #
 
     @classmethod
-    def get(cls, object_id):
-        """Retrieve a single object from Turbasen by its object id"""
-        object = Settings.CACHE.get('turbasen.object.%s' % object_id)
+    def get(cls, object_id, prefetch=None):
+        """Retrieve a single object from Turbasen by its object id. Optionally resolve the
+        documents referenced in the fields listed in `prefetch`, see `references`."""
+        object = cls._get_local(object_id)
         if object is None:
-            logger.debug("[get %s/%s]: Not in local cache, performing GET request..." % (
+            logger.debug(
+                "[get %s/%s]: Not in local cache, performing GET request...",
                 cls.identifier,
                 object_id,
-            ))
-            headers, document = NTBObject._get_document(cls.identifier, object_id)
-            return cls(_etag=headers['etag'], **document)
+            )
+            headers, document = cls._get_document(object_id)
+            object = cls(_etag=headers['etag'], **document)
         else:
-            logger.debug("[get %s/%s]: Retrieved cached object, refreshing..." % (
+            logger.debug(
+                "[get %s/%s]: Retrieved cached object, refreshing...",
                 cls.identifier,
                 object_id,
-            ))
+            )
             object._refresh()
+
+        object = identity.merge(object)
+        events.trigger('object.accessed', object)
+        if prefetch:
+            cls._prefetch([object], prefetch)
+        return object
+
+    @classmethod
+    def _get_local(cls, object_id):
+        """Return the object with the given id from the cache or, if configured, the read-only
+        document store. Returns None if it's in neither."""
+        object = cls._rebind(cls.settings.CACHE.get(cls._cache_key('object.%s' % object_id)))
+        if object is None and cls.settings.STORE is not None:
+            object = cls.settings.STORE.get(cls, object_id)
+        return object
+
+    @classmethod
+    def _rebind(cls, object):
+        """Return a copy of the given cached object as an object of this datatype, if it is of
+        another. Objects of datatypes bound to a client are cached as objects of the unbound
+        datatype when the cache backend pickles them."""
+        if object is None or type(object) is cls:
             return object
+        rebound = cls.__new__(cls)
+        rebound.__dict__.update(object.__dict__)
+        rebound.data = object.data.copy()
+        rebound._references = {}
+        return rebound
 
-    @staticmethod
-    def _get_document(identifier, object_id, etag=None):
+    @classmethod
+    def _get_document(cls, object_id, etag=None):
         # Handle the special case of empty object_id provided; the resulting request would have
         # returned a list lookup
         if object_id == '':
             raise DocumentNotFound("No documents have an empty object id")
 
-        params = {'api_key': Settings.API_KEY}
+        params = {'api_key': cls.settings.API_KEY}
 
         headers = {}
         if etag is not None:
             headers['if-none-match'] = etag
 
         events.trigger('api.get_object')
-        request = requests.get(
-            '%s/%s/%s' % (Settings.ENDPOINT_URL, identifier, object_id),
+        request = hedging.hedger(cls.settings).get(
+            cls.settings,
+            cls.session,
+            '%s/%s/%s' % (cls.settings.ENDPOINT_URL, cls.identifier, object_id),
             headers=headers,
             params=params,
         )
@@ -252,7 +417,7 @@ class NTBObject(UserDict):
     #
 
     @classmethod
-    def list(cls, pages=None, params=dict()):
+    def list(cls, pages=None, params=dict(), prefetch=None):
         """
         Retrieve a complete list of these objects, partially fetched.
         Arguments:
@@ -263,6 +428,9 @@ class NTBObject(UserDict):
             Add API filter parameters. Note the special parameter 'fields' which can be used to
             include more fields in the partial objects. The following params are reserved for
             internal pagination: 'limit', 'skip'
+        - prefetch: List of field names
+            Resolve the documents referenced in these fields for all objects in the result, see
+            `references`. The fields are added to the 'fields' parameter.
         """
         params = params_to_dotnotation(params.copy())
 
@@ -270,27 +438,142 @@ class NTBObject(UserDict):
         if 'fields' in params and type(params['fields']) != list:
             params['fields'] = [params['fields']]
 
-        # Create a cache key with the dict's hash. Ensure the 'fields' iterable is a tuple, which is
-        # hashable. Use a copy to avoid mutating the original dict, where we prefer to keep the
-        # unhashable list.
-        params_copy = params.copy()
-        if 'fields' in params_copy:
-            params_copy['fields'] = tuple(params_copy['fields'])
-        params_key = hash(frozenset(params_copy.items()))
-        cache_key = 'turbasen.objects.%s.%s.%s' % (cls.identifier, pages, params_key)
-
-        objects = Settings.CACHE.get(cache_key)
-        if objects is None:
-            logger.debug("[list %s (pages=%s)]: Not cached, performing GET request(s)..." % (
+        # Include the prefetched reference fields in the partial objects
+        if prefetch:
+            params['fields'] = params.get('fields', []) + list(prefetch)
+
+        # Include fields that have previously caused partial objects to be fetched
+        if cls.settings.AUTO_FIELDS:
+            params['fields'] = params.get('fields', []) + projection.suggested_fields(cls)
+
+        cache_key = cls._list_cache_key(pages, params)
+        events.trigger('list.accessed', cls, pages, dict(params))
+
+        documents = cls.settings.CACHE.get(cache_key)
+        if documents is None:
+            logger.debug(
+                "[list %s (pages=%s)]: Not cached, performing GET request(s)...",
                 cls.identifier,
                 pages,
-            ))
-            objects = list(NTBObject.NTBIterator(cls, pages, params))
-            Settings.CACHE.set(cache_key, objects, Settings.CACHE_LOOKUP_PERIOD)
+            )
+            objects = cls._load_list(cache_key, pages, params)
         else:
-            logger.debug("[list %s (pages=%s)]: Retrieved from cache" % (cls.identifier, pages))
+            logger.debug("[list %s (pages=%s)]: Retrieved from cache", cls.identifier, pages)
+            objects = [cls._from_list_document(document) for document in documents]
+
+        if prefetch:
+            cls._prefetch(objects, prefetch)
         return objects
 
+    @classmethod
+    def _cache_key(cls, key):
+        """Return the full cache key for `key`. Keys of datatypes bound to a client are namespaced
+        by the client's endpoint and API key, so clients sharing a cache backend don't see each
+        other's documents."""
+        if cls.client is None:
+            return 'turbasen.%s' % key
+        namespace = '%s\n%s' % (cls.settings.ENDPOINT_URL, cls.settings.API_KEY)
+        return 'turbasen.%s.%s' % (hashlib.sha1(namespace.encode('utf-8')).hexdigest()[:12], key)
+
+    @classmethod
+    def _list_cache_key(cls, pages, params):
+        """Return the cache key of a list. It has a stable digest of the params, so that the key is
+        equal across processes sharing the same cache backend. The collection generation is
+        included so that any write to the collection invalidates all of its cached lists."""
+        return cls._cache_key('objects.%s.v%s.%s.%s.%s' % (
+            cls.identifier,
+            cls.settings.CACHE_KEY_VERSION,
+            cls._list_generation(),
+            pages,
+            params_to_cache_key(params),
+        ))
+
+    @classmethod
+    def _load_list(cls, cache_key, pages, params):
+        """Retrieve a list and cache it with the given key"""
+        objects = list(cls.NTBIterator(cls, pages, params))
+        cls.settings.CACHE.set(
+            cache_key,
+            [object.data for object in objects],
+            cls.settings.CACHE_LOOKUP_PERIOD,
+        )
+        return [identity.merge(object) for object in objects]
+
+    @classmethod
+    def count(cls, params=dict()):
+        """
+        Return the number of these objects matching the given API filter parameters, without
+        retrieving the documents. Performs a single request for a page with one document and reads
+        its total count.
+        """
+        params = params_to_dotnotation(params.copy())
+        params.pop('fields', None)
+
+        cache_key = cls._cache_key('count.%s.v%s.%s.%s' % (
+            cls.identifier,
+            cls.settings.CACHE_KEY_VERSION,
+            cls._list_generation(),
+            params_to_cache_key(params),
+        ))
+
+        count = cls.settings.CACHE.get(cache_key)
+        if count is None:
+            logger.debug("[count %s]: Not cached, performing GET request...", cls.identifier)
+            params.update({
+                'api_key': cls.settings.API_KEY,
+                'limit': 1,
+                'skip': 0,
+                'fields': '_id',
+            })
+            count = cls._request_list(params).json()['total']
+            cls.settings.CACHE.set(cache_key, count, cls.settings.CACHE_LOOKUP_PERIOD)
+        else:
+            logger.debug("[count %s]: Retrieved from cache", cls.identifier)
+        return count
+
+    @classmethod
+    def _request_list(cls, params, headers=None):
+        """Perform a list request with the given parameters, triggering the `api.get_objects` event
+        and raising any exception for the response status. Returns the response."""
+        events.trigger('api.get_objects')
+        request = cls.session.get(
+            '%s/%s' % (cls.settings.ENDPOINT_URL, cls.identifier),
+            headers=headers,
+            params=params,
+        )
+        NTBObject._handle_response(request, 'GET')
+        return request
+
+    @classmethod
+    def _from_list_document(cls, document):
+        """Resolve a cached list document against the object cache. If the full object is cached
+        with a matching checksum, return it; otherwise return a partial object."""
+        etag = "\"%s\"" % document['checksum']
+        object = cls._rebind(cls.settings.CACHE.get(cls._cache_key('object.%s' % document['_id'])))
+        if object is None or object._etag != etag:
+            object = cls(_etag=etag, _is_partial=True, **document)
+        return identity.merge(object)
+
+    @classmethod
+    def _list_generation(cls):
+        """Return the current generation token for cached lists of this collection, creating one if
+        none is cached"""
+        generation = cls.settings.CACHE.get(cls._cache_key('generation.%s' % cls.identifier))
+        if generation is None:
+            generation = cls._invalidate_lists()
+        return generation
+
+    @classmethod
+    def _invalidate_lists(cls):
+        """Assign a new generation token to this collection, invalidating all of its cached lists"""
+        generation = uuid4().hex
+        cls.settings.CACHE.set(
+            cls._cache_key('generation.%s' % cls.identifier),
+            generation,
+            cls.settings.CACHE_GET_PERIOD,
+        )
+        return generation
+
     class NTBIterator:
         """Iterates a paginated document resultset from Turbasen"""
         DEFAULT_FIELDS = [
@@ -309,7 +592,7 @@ class NTBObject(UserDict):
 
             # Combine and add user-specified and default fields
             fields = set(self.DEFAULT_FIELDS + self.params.get('fields', []))
-            self.params['fields'] = ','.join(fields)
+            self.params['fields'] = ','.join(sorted(fields))
 
         def __iter__(self):
             self.bulk_index = 0
@@ -337,19 +620,13 @@ class NTBObject(UserDict):
             params = self.params
 
             # API key
-            params['api_key'] = Settings.API_KEY
+            params['api_key'] = self.cls.settings.API_KEY
 
             # Set pagination parameters
-            params['limit'] = Settings.LIMIT
+            params['limit'] = self.cls.settings.LIMIT
             params['skip'] = self.bulk_index
 
-            events.trigger('api.get_objects')
-            request = requests.get(
-                '%s/%s' % (Settings.ENDPOINT_URL, self.cls.identifier),
-                params=params,
-            )
-            NTBObject._handle_response(request, 'GET')
-            response = request.json()
+            response = self.get_page(params)
             self.document_list = response['documents']
             self.document_index = 0
             self.bulk_index += len(self.document_list)
@@ -361,10 +638,64 @@ class NTBObject(UserDict):
             if self.bulk_index == response['total']:
                 # All documents retrieved
                 self.exhausted = True
-            elif self.pages is not None and self.bulk_index >= self.pages * Settings.LIMIT:
+            elif self.pages is not None and self.bulk_index >= self.pages * self.cls.settings.LIMIT:
                 # Specified page limit reached
                 self.exhausted = True
 
+        def get_page(self, params):
+            """Return the response for a page of documents. Pages are cached along with their
+            ETag/Last-Modified headers and revalidated with a conditional request. If the server
+            didn't provide either header, the page is revalidated by comparing the ids and
+            checksums of the page documents, which is a much smaller request."""
+            page_params = {key: value for key, value in params.items() if key != 'api_key'}
+            page_key = self.cls._cache_key('page.%s.v%s.%s' % (
+                self.cls.identifier,
+                self.cls.settings.CACHE_KEY_VERSION,
+                params_to_cache_key(page_params),
+            ))
+            page = self.cls.settings.CACHE.get(page_key)
+
+            headers = {}
+            if page is not None:
+                if page['etag'] is not None:
+                    headers['if-none-match'] = page['etag']
+                if page['last_modified'] is not None:
+                    headers['if-modified-since'] = page['last_modified']
+                if not headers and self.page_unchanged(page['response'], params):
+                    logger.debug(
+                        "[list %s (skip=%s)]: Page checksums unchanged, using cached page",
+                        self.cls.identifier,
+                        params['skip'],
+                    )
+                    return page['response']
+
+            request = self.cls._request_list(params, headers)
+            if request.status_code == 304 and page is not None:
+                logger.debug(
+                    "[list %s (skip=%s)]: Page was not modified, using cached page",
+                    self.cls.identifier,
+                    params['skip'],
+                )
+                return page['response']
+
+            response = request.json()
+            self.cls.settings.CACHE.set(page_key, {
+                'etag': request.headers.get('etag'),
+                'last_modified': request.headers.get('last-modified'),
+                'response': response,
+            }, self.cls.settings.CACHE_GET_PERIOD)
+            return response
+
+        def page_unchanged(self, response, params):
+            """Request only the ids and checksums for the given page, and compare them with the
+            documents in the cached response"""
+            checksums = self.cls._request_list(dict(params, fields='_id,checksum')).json()
+            return checksums['total'] == response['total'] and [
+                (document['_id'], document['checksum']) for document in checksums['documents']
+            ] == [
+                (document['_id'], document['checksum']) for document in response['documents']
+            ]
+
     @staticmethod
     def _handle_response(request, method):
         """Handle responses from the API, logging warnings and raising any appropriate exception
@@ -375,7 +706,7 @@ class NTBObject(UserDict):
             response = {}
 
         for warning in response.get('warnings', []):
-            logger.warning("API warning: %s" % warning)
+            logger.warning("API warning: %s", warning)
 
         if request.status_code in [401, 403]:
             raise Unauthorized("HTTP %s: %s" % (request.status_code, response))
@@ -389,6 +720,10 @@ class NTBObject(UserDict):
         elif request.status_code in range(500, 512):
             raise ServerError("HTTP %s: %s" % (request.status_code, response))
 
+        # Conditional requests may return 304 Not Modified
+        if method == 'GET' and request.status_code == 304:
+            return
+
         expected_response = {
             'GET': 200,
             'POST': 201,
@@ -398,8 +733,9 @@ class NTBObject(UserDict):
         }
 
         if method in expected_response and expected_response[method] != request.status_code:
-            logger.warning("HTTP %s: Expected status code %s; received %s" % (
+            logger.warning(
+                "HTTP %s: Expected status code %s; received %s",
                 method,
                 expected_response[method],
                 request.status_code,
-            ))
+            )
@@ -1,3 +1,8 @@
+from collections import OrderedDict
+import pickle
+import threading
+import time
+
 class DummyCache:
     """
     A dummy cache implementation which stores nothing and always returns None
@@ -11,3 +16,53 @@ class DummyCache:
 
     def delete(self, key):
         pass
+
+class TieredCache:
+    """
+    A small in-process LRU cache in front of a shared cache backend, for example memcached. Reads
+    are served from local memory when possible, and fall back to the shared cache. Writes and
+    deletes go through to both.
+
+    Local entries are retained for at most `timeout` seconds, which bounds how long writes made by
+    other processes to the shared cache may go unnoticed in this process. Like with other cache
+    backends, values are stored pickled and each read returns a new copy, so changes to a returned
+    object don't affect the cached value.
+    """
+
+    def __init__(self, cache, size=1000, timeout=60):
+        self.cache = cache
+        self.size = size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def set(self, key, value, duration):
+        self.cache.set(key, value, duration)
+        self._set_local(key, value, min(duration, self.timeout))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return pickle.loads(value)
+                del self.entries[key]
+
+        value = self.cache.get(key)
+        if value is not None:
+            self._set_local(key, value, self.timeout)
+        return value
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+        self.cache.delete(key)
+
+    def _set_local(self, key, value, duration):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + duration, pickle.dumps(value))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
@@ -0,0 +1,64 @@
+from .datatypes import Bilde, Gruppe, Liste, Område, Sted, Tur
+from .settings import apply_settings, copy_settings
+from .transport import create_session
+
+class TurbasenClient:
+    """
+    An independent Turbasen client, with its own settings and pool of HTTP connections, optionally
+    over HTTP/2 (see `turbasen.transport.create_session`). Use it to talk to several
+    endpoints or with several API keys in the same process, or to avoid sharing configuration
+    between libraries.
+
+    The client starts out with a copy of the global settings, overridden by the given settings, and
+    later changes to either don't affect the other. Its datatypes are available as attributes with
+    the same names as the module level datatypes, for example `client.Tur.get(object_id)`.
+
+    The cache backend is shared with the global settings unless `CACHE` is given, but the client's
+    cache keys are namespaced by its endpoint and API key.
+
+    Requests are sent with a new session unless a `session` implementing the requests session API
+    is given, for example a `turbasen.replay.ReplaySession`.
+
+    Note that event handlers are still shared with the rest of the process; use the `client`
+    attribute of objects to tell clients apart.
+    """
+    DATATYPES = [Bilde, Gruppe, Liste, Område, Sted, Tur]
+
+    # Settings used to create the session
+    SESSION_SETTINGS = ['WORKERS', 'COMPRESSION', 'HTTP2']
+
+    def __init__(self, session=None, **settings):
+        self.settings = copy_settings(**settings)
+        self.own_session = session is None
+        self.session = create_session(self.settings) if self.own_session else session
+
+        self.datatypes = {}
+        for datatype in self.DATATYPES:
+            bound = type(datatype.__name__, (datatype,), {
+                '__module__': datatype.__module__,
+                'client': self,
+                'settings': self.settings,
+                'session': self.session,
+                '_unbound': datatype,
+            })
+            self.datatypes[datatype.identifier] = bound
+            setattr(self, datatype.__name__, bound)
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self.settings.ENDPOINT_URL)
+
+    def configure(self, **settings):
+        """Change the settings of this client only. Changing `WORKERS`, `COMPRESSION` or `HTTP2`
+        replaces the client's session with a new one, unless the session was given when creating
+        the client."""
+        apply_settings(self.settings, settings)
+        if self.own_session and any(key in settings for key in self.SESSION_SETTINGS):
+            # Requests in progress keep using the previous session, which is closed when it's
+            # garbage collected
+            self.session = create_session(self.settings)
+            for datatype in self.datatypes.values():
+                datatype.session = self.session
+
+    def close(self):
+        """Close the client's pooled HTTP connections"""
+        self.session.close()
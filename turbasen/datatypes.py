@@ -1,4 +1,5 @@
 from .apiclient import NTBObject
+from .geometry import GeometryMixin
 
 class Bilde(NTBObject):
     identifier = 'bilder'
@@ -12,8 +13,8 @@ class Liste(NTBObject):
 class Område(NTBObject):
     identifier = 'områder'
 
-class Sted(NTBObject):
+class Sted(GeometryMixin, NTBObject):
     identifier = 'steder'
 
-class Tur(NTBObject):
+class Tur(GeometryMixin, NTBObject):
     identifier = 'turer'
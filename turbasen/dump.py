@@ -0,0 +1,201 @@
+"""
+Parallel dumps of complete collections to NDJSON files, one document per line (gzip compressed if
+the path ends with `.gz`).
+
+The collection is split into shards of `skip` ranges, which are downloaded concurrently by a pool
+of threads. Decoding and encoding the documents is done by a pool of processes, so it isn't limited
+to one CPU. Each shard is written to a part file in `<path>.parts` as soon as it's complete, and the
+part files are concatenated when all shards are done, so an interrupted dump can be resumed.
+
+The total is counted with an uncached request when the dump starts, and the last shard keeps
+paging past it until a page isn't full, so documents created since are included. Documents created
+or deleted during a dump may still shift the skip ranges, so a dump of a collection that changes
+while it's running may miss or repeat documents.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+
+from .apiclient import NTBObject
+from .util import params_to_dotnotation
+
+logger = logging.getLogger('turbasen')
+
+# The maximum number of documents per page allowed by the API
+PAGE_SIZE = 50
+
+def encode_shard(pages, compress):
+    """Return the number of documents and the NDJSON encoding of the documents in the given page
+    responses. Runs in a worker process."""
+    lines = []
+    for page in pages:
+        for document in json.loads(page)['documents']:
+            lines.append(json.dumps(document, ensure_ascii=False, separators=(',', ':')) + '\n')
+    data = ''.join(lines).encode('utf-8')
+    return len(lines), gzip.compress(data) if compress else data
+
+class Dump:
+    """
+    Dumps the documents of a datatype class matching `params` to `path`. Includes the list fields
+    in `fields` in addition to the default fields (see `NTBObject.NTBIterator`). Shards have
+    `shard_size` documents, and are downloaded by `workers` threads and encoded by `processes`
+    processes, or in the downloading threads if `processes` is 0. Set `resume` to keep the shards
+    of a previous interrupted dump with the same arguments. Progress is written to `progress`,
+    unless it's None.
+    """
+
+    def __init__(self, collection, path, params=dict(), fields=[], shard_size=1000, workers=8,
+                 processes=None, resume=False, progress=sys.stderr):
+        self.collection = collection
+        self.path = path
+        self.params = params_to_dotnotation(params.copy())
+        fields = set(NTBObject.NTBIterator.DEFAULT_FIELDS + fields)
+        self.params['fields'] = ','.join(sorted(fields))
+        self.shard_size = shard_size
+        self.workers = workers
+        self.processes = processes
+        self.resume = resume
+        self.progress = progress
+        self.compress = path.endswith('.gz')
+        self.directory = path + '.parts'
+        self.lock = threading.Lock()
+
+    def run(self):
+        """Perform the dump, returning the number of documents written"""
+        self.total = self.get({'skip': 0, 'limit': 1, 'fields': '_id'}).json()['total']
+        shards = list(range(max((self.total + self.shard_size - 1) // self.shard_size, 1)))
+        self.prepare()
+        pending = [shard for shard in shards if not os.path.exists(self.part_path(shard))]
+
+        self.started = time.monotonic()
+        self.documents = 0
+        self.bytes = 0
+        self.completed = len(shards) - len(pending)
+        self.shards = len(shards)
+        self.counts = {}
+
+        if self.processes == 0:
+            self.processes_executor = None
+            self.dump_shards(pending)
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes) as self.processes_executor:
+                self.dump_shards(pending)
+
+        count = self.concatenate(shards)
+        self.report("Wrote %s documents to %s" % (count, self.path))
+        return count
+
+    def prepare(self):
+        """Create the part file directory, keeping parts of a previous dump with the same
+        arguments if resuming"""
+        manifest = {
+            'identifier': self.collection.identifier,
+            'params': self.params,
+            'shard_size': self.shard_size,
+            'total': self.total,
+        }
+        manifest_path = os.path.join(self.directory, 'manifest.json')
+        if self.resume and os.path.exists(manifest_path):
+            with open(manifest_path) as file:
+                if json.load(file) == manifest:
+                    return
+            logger.warning("[dump %s]: Arguments or total changed; not resuming", self.path)
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+        with open(manifest_path, 'w') as file:
+            json.dump(manifest, file)
+
+    def part_path(self, shard):
+        return os.path.join(self.directory, '%06d%s' % (shard, '.gz' if self.compress else ''))
+
+    def dump_shards(self, shards):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(self.dump_shard, shard) for shard in shards]:
+                future.result()
+
+    def dump_shard(self, shard):
+        pages = []
+        skip = shard * self.shard_size
+        end = min(skip + self.shard_size, self.total)
+        limit = PAGE_SIZE
+        while skip < end:
+            limit = min(PAGE_SIZE, end - skip)
+            pages.append(self.get_page(skip, limit))
+            skip += limit
+
+        if shard == self.shards - 1:
+            # Documents created since the total was counted follow it
+            while not pages or len(json.loads(pages[-1])['documents']) == limit:
+                limit = PAGE_SIZE
+                pages.append(self.get_page(skip, limit))
+                skip += limit
+
+        if self.processes_executor is None:
+            count, data = encode_shard(pages, self.compress)
+        else:
+            future = self.processes_executor.submit(encode_shard, pages, self.compress)
+            count, data = future.result()
+
+        # Write to a temporary file first, so that only complete parts exist
+        path = self.part_path(shard)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(data)
+        os.replace(path + '.tmp', path)
+
+        with self.lock:
+            self.counts[shard] = count
+            self.documents += count
+            self.bytes += len(data)
+            self.completed += 1
+            elapsed = time.monotonic() - self.started
+            self.report("Shard %s/%s: %s documents, %.0f documents/s, %.2f MB/s" % (
+                self.completed,
+                self.shards,
+                self.documents,
+                self.documents / elapsed,
+                self.bytes / elapsed / 1e6,
+            ))
+
+    def get_page(self, skip, limit):
+        """Return the raw response text of a page of documents"""
+        return self.get({'skip': skip, 'limit': limit}).text
+
+    def get(self, params):
+        """Perform an uncached list request with the dump's parameters, overridden by the given
+        parameters"""
+        collection = self.collection
+        return collection._request_list(dict(
+            self.params,
+            api_key=collection.settings.API_KEY,
+            **params
+        ))
+
+    def concatenate(self, shards):
+        """Concatenate the part files to the output file, and remove them. Gzip files may be
+        concatenated as they are. Returns the number of documents written."""
+        count = 0
+        with open(self.path + '.tmp', 'wb') as output:
+            for shard in shards:
+                with open(self.part_path(shard), 'rb') as part:
+                    data = part.read()
+                output.write(data)
+                if shard in self.counts:
+                    count += self.counts[shard]
+                else:
+                    # Resumed from a previous dump
+                    count += (gzip.decompress(data) if self.compress else data).count(b'\n')
+        os.replace(self.path + '.tmp', self.path)
+        shutil.rmtree(self.directory)
+        return count
+
+    def report(self, message):
+        if self.progress is not None:
+            self.progress.write('%s\n' % message)
+            self.progress.flush()
@@ -1,11 +1,120 @@
+import logging
+import queue
+import threading
+import time
+
+from .settings import Settings
+
+logger = logging.getLogger('turbasen')
+
 handlers = {}
 
+# Timing statistics for each (event, callback) pair: number of calls, total and max seconds spent
+timings = {}
+timings_lock = threading.Lock()
+
 def handle_event(event, callback):
     if event in handlers:
         handlers[event].append(callback)
     else:
         handlers[event] = [callback]
 
-def trigger(event):
-    for callback in handlers.get(event, []):
-        callback()
+def remove_handler(event, callback):
+    """Unregister a callback previously registered with `handle_event`, and drop its timing
+    statistics for the event once it's no longer registered"""
+    if callback not in handlers.get(event, []):
+        raise ValueError("%r is not registered for the event '%s'" % (callback, event))
+    handlers[event].remove(callback)
+    if callback not in handlers[event]:
+        with timings_lock:
+            timings.pop((event, callback), None)
+
+def trigger(event, *args):
+    if not handlers.get(event):
+        return
+
+    if Settings.EVENT_DISPATCH == 'async':
+        Dispatcher.get().put(event, args)
+    else:
+        run_handlers(event, args)
+
+def run_handlers(event, args):
+    for callback in list(handlers.get(event, [])):
+        start = time.perf_counter()
+        try:
+            callback(*args)
+        finally:
+            record_timing(event, callback, time.perf_counter() - start)
+
+def record_timing(event, callback, duration):
+    with timings_lock:
+        timing = timings.setdefault((event, callback), {'calls': 0, 'total': 0.0, 'max': 0.0})
+        timing['calls'] += 1
+        timing['total'] += duration
+        timing['max'] = max(timing['max'], duration)
+
+    if duration > Settings.EVENT_SLOW_HANDLER_PERIOD:
+        logger.warning(
+            "[events %s]: Handler %r took %.3f seconds",
+            event,
+            callback,
+            duration,
+        )
+
+def flush():
+    """Block until all events queued for asynchronous dispatch have been handled"""
+    if Dispatcher.instance is not None:
+        Dispatcher.instance.queue.join()
+
+class Dispatcher:
+    """Runs event handlers on a background thread, with a bounded queue of pending events. When the
+    queue is full, `Settings.EVENT_OVERFLOW` decides whether to drop the new event ('drop_new'),
+    drop the oldest queued event ('drop_old') or wait for room ('block')."""
+    instance = None
+    instance_lock = threading.Lock()
+
+    @classmethod
+    def get(cls):
+        with cls.instance_lock:
+            if cls.instance is None:
+                cls.instance = cls(Settings.EVENT_QUEUE_SIZE)
+            return cls.instance
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, name='turbasen-events', daemon=True)
+        self.thread.start()
+
+    def put(self, event, args):
+        if Settings.EVENT_OVERFLOW == 'block':
+            self.queue.put((event, args))
+            return
+
+        while True:
+            try:
+                self.queue.put_nowait((event, args))
+                return
+            except queue.Full:
+                self.dropped += 1
+                if Settings.EVENT_OVERFLOW == 'drop_new':
+                    logger.warning("[events %s]: Queue is full; dropping event", event)
+                    return
+
+            # Make room by dropping the oldest queued event
+            try:
+                dropped_event, dropped_args = self.queue.get_nowait()
+                self.queue.task_done()
+                logger.warning("[events %s]: Queue is full; dropping event", dropped_event)
+            except queue.Empty:
+                pass
+
+    def run(self):
+        while True:
+            event, args = self.queue.get()
+            try:
+                run_handlers(event, args)
+            except Exception:
+                logger.exception("[events %s]: Handler raised an exception", event)
+            finally:
+                self.queue.task_done()
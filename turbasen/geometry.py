@@ -0,0 +1,169 @@
+from collections import OrderedDict
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EARTH_RADIUS = 6371008.8
+
+class Geometry:
+    """
+    The GeoJSON geometry of a document (its `geojson` field) as NumPy arrays of coordinates, with
+    vectorized measurements. Supports Point, LineString and MultiLineString geometries. Each part is
+    an array with one row per position: longitude, latitude and optionally elevation.
+
+    Use `Geometry.for_object` (or `geometry()` on `Sted` and `Tur` objects) to reuse geometries
+    already computed for the same document version. Requires NumPy.
+    """
+
+    # Geometries of recently used document versions, keyed by identifier, object id and ETag
+    cache = OrderedDict()
+    cache_size = 1000
+    cache_lock = threading.Lock()
+
+    def __init__(self, geojson):
+        if numpy is None:
+            raise ImportError("turbasen.geometry requires NumPy: pip install turbasen[geometry]")
+
+        self.type = geojson['type']
+        if self.type == 'Point':
+            parts = [[geojson['coordinates']]]
+        elif self.type == 'LineString':
+            parts = [geojson['coordinates']]
+        elif self.type == 'MultiLineString':
+            parts = geojson['coordinates']
+        else:
+            raise ValueError("Unsupported geometry type '%s'" % self.type)
+
+        self.parts = [numpy.asarray(part, dtype=float) for part in parts]
+        self.simplified = {}
+
+    @classmethod
+    def for_object(cls, object):
+        """Return the geometry of the given object, reusing a previously computed geometry if the
+        document's ETag is unchanged"""
+        key = (object.identifier, object.get_field('_id'), object._etag)
+        with cls.cache_lock:
+            geometry = cls.cache.get(key)
+            if geometry is not None:
+                cls.cache.move_to_end(key)
+                return geometry
+
+        geometry = cls(object['geojson'])
+        if key[1] is not None and key[2] is not None:
+            with cls.cache_lock:
+                cls.cache[key] = geometry
+                while len(cls.cache) > cls.cache_size:
+                    cls.cache.popitem(last=False)
+        return geometry
+
+    @property
+    def coordinates(self):
+        """All positions of all parts, as one array"""
+        return numpy.concatenate(self.parts)
+
+    def bbox(self):
+        """Return the bounding box as (min longitude, min latitude, max longitude, max latitude)"""
+        coordinates = self.coordinates[:, :2]
+        return tuple(float(value) for value in (*coordinates.min(axis=0), *coordinates.max(axis=0)))
+
+    def length(self):
+        """Return the total length in meters along the surface of the earth (haversine)"""
+        total = 0.0
+        for part in self.parts:
+            if len(part) < 2:
+                continue
+            longitude, latitude = numpy.radians(part[:, 0]), numpy.radians(part[:, 1])
+            latitude_term = numpy.sin(numpy.diff(latitude) / 2) ** 2
+            longitude_term = numpy.sin(numpy.diff(longitude) / 2) ** 2
+            a = latitude_term + numpy.cos(latitude[:-1]) * numpy.cos(latitude[1:]) * longitude_term
+            total += float(numpy.sum(2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(a))))
+        return total
+
+    def elevation(self):
+        """Return a dict with min, max, total ascent and total descent of the elevations in meters,
+        or None if the geometry has no elevations"""
+        parts = [part[:, 2] for part in self.parts if part.shape[1] > 2]
+        if not parts:
+            return None
+
+        differences = numpy.concatenate([numpy.diff(part) for part in parts])
+        elevations = numpy.concatenate(parts)
+        return {
+            'min': float(elevations.min()),
+            'max': float(elevations.max()),
+            'ascent': float(differences[differences > 0].sum()),
+            'descent': float(-differences[differences < 0].sum()),
+        }
+
+    def simplify(self, tolerance):
+        """Return a new geometry simplified with the Douglas-Peucker algorithm, omitting positions
+        closer than `tolerance` meters to the simplified line. Results are kept for each
+        tolerance, so map tiles for several zoom levels can be computed once per document
+        version."""
+        if tolerance not in self.simplified:
+            simplified = Geometry.__new__(Geometry)
+            simplified.type = self.type
+            simplified.parts = [part[simplify_mask(part, tolerance)] for part in self.parts]
+            simplified.simplified = {}
+            self.simplified[tolerance] = simplified
+        return self.simplified[tolerance]
+
+    def to_geojson(self):
+        """Return the geometry as a GeoJSON dict"""
+        if self.type == 'Point':
+            coordinates = self.parts[0][0].tolist()
+        elif self.type == 'LineString':
+            coordinates = self.parts[0].tolist()
+        else:
+            coordinates = [part.tolist() for part in self.parts]
+        return {'type': self.type, 'coordinates': coordinates}
+
+def simplify_mask(part, tolerance):
+    """Return a boolean array of the positions kept by Douglas-Peucker simplification of a line"""
+    keep = numpy.zeros(len(part), dtype=bool)
+    if len(part) < 3:
+        keep[:] = True
+        return keep
+
+    # Project to meters with an equirectangular projection around the line's mean latitude, which
+    # is accurate enough for distances within a trip
+    scale = numpy.radians(EARTH_RADIUS)
+    points = numpy.column_stack((
+        part[:, 0] * scale * numpy.cos(numpy.radians(part[:, 1].mean())),
+        part[:, 1] * scale,
+    ))
+
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        segment_length = numpy.hypot(*segment)
+        if segment_length == 0:
+            distances = numpy.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = numpy.abs(
+                segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]
+            ) / segment_length
+
+        index = int(numpy.argmax(distances))
+        if distances[index] > tolerance:
+            index += start + 1
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return keep
+
+class GeometryMixin:
+    """Adds geometry access to datatypes with a `geojson` field"""
+
+    def geometry(self):
+        """Return the `geojson` field as a `turbasen.geometry.Geometry`. Requires NumPy."""
+        return Geometry.for_object(self)
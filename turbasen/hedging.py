@@ -0,0 +1,112 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import logging
+import threading
+import time
+import weakref
+
+logger = logging.getLogger('turbasen')
+
+class Hedger:
+    """
+    Hedges idempotent GET requests: if no response has arrived within the `HEDGE_PERCENTILE`
+    percentile of recently observed latencies, a duplicate request is sent, and whichever response
+    arrives first is used. At most a `HEDGE_RATIO` fraction of requests are hedged, which caps the
+    extra load on the API.
+
+    The slower response is discarded when it arrives; requests in flight can't be aborted.
+
+    Requests that can't be hedged, because too few latencies have been observed or the hedging
+    ratio doesn't allow it, are sent on the caller's thread. The others are sent by a pool of
+    `workers` threads, so that the caller can take whichever response arrives first. The pool never
+    queues requests: when all its threads are busy, requests are sent on the caller's thread
+    without hedging.
+    """
+    SAMPLES = 1000
+    MIN_SAMPLES = 20
+
+    def __init__(self, workers):
+        self.latencies = deque(maxlen=self.SAMPLES)
+        self.requests = 0
+        self.hedged = 0
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers)
+
+    def delay(self, percentile):
+        """Return the given percentile of the observed latencies, or None if too few latencies have
+        been observed"""
+        with self.lock:
+            if len(self.latencies) < self.MIN_SAMPLES:
+                return None
+            latencies = sorted(self.latencies)
+        index = int(len(latencies) * percentile / 100)
+        return latencies[min(index, len(latencies) - 1)]
+
+    def get(self, settings, session, url, **kwargs):
+        """Perform a GET request with the given requests session (or module), hedging it if
+        enabled in the given settings"""
+        if settings.HEDGE_PERCENTILE is None:
+            return session.get(url, **kwargs)
+
+        def send():
+            start = time.perf_counter()
+            response = session.get(url, **kwargs)
+            with self.lock:
+                self.latencies.append(time.perf_counter() - start)
+            return response
+
+        delay = self.delay(settings.HEDGE_PERCENTILE)
+        with self.lock:
+            self.requests += 1
+            hedgeable = delay is not None and self.hedged < self.requests * settings.HEDGE_RATIO
+        if not hedgeable or not self.slots.acquire(blocking=False):
+            return send()
+
+        primary = self.submit(send)
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+        if not self.slots.acquire(blocking=False):
+            return primary.result()
+        if not self.reserve(settings.HEDGE_RATIO):
+            self.slots.release()
+            return primary.result()
+
+        logger.debug("[hedging %s]: No response after %.3f seconds, hedging", url, delay)
+        pending = {primary, self.submit(send)}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+            if not pending:
+                # Both requests failed
+                return primary.result()
+
+    def submit(self, function):
+        """Run a function in the pool, on a slot already acquired, releasing the slot when it's
+        done"""
+        future = self.executor.submit(function)
+        future.add_done_callback(lambda future: self.slots.release())
+        return future
+
+    def reserve(self, ratio):
+        """Count a hedged request if the hedging ratio allows it"""
+        with self.lock:
+            if self.hedged >= self.requests * ratio:
+                return False
+            self.hedged += 1
+            return True
+
+
+hedgers = weakref.WeakKeyDictionary()
+hedgers_lock = threading.Lock()
+
+def hedger(settings):
+    """Return the hedger for the given settings class, which is shared by all datatypes using the
+    same settings. Its pool has `WORKERS` threads, and it's replaced when `WORKERS` changes."""
+    with hedgers_lock:
+        if settings not in hedgers or hedgers[settings].workers != settings.WORKERS:
+            hedgers[settings] = Hedger(settings.WORKERS)
+        return hedgers[settings]
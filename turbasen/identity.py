@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+import threading
+import weakref
+
+from .settings import Settings
+
+class IdentityMap:
+    """
+    Maps each (client, datatype identifier, object id) to one live object, so that all lookups of
+    the same document share an instance. Objects are weakly referenced, and are dropped from the
+    map when no longer in use elsewhere.
+    """
+
+    def __init__(self):
+        self.objects = weakref.WeakValueDictionary()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.objects)
+
+    def get(self, collection, object_id):
+        return self.objects.get((collection.client, collection.identifier, object_id))
+
+    def merge(self, object):
+        """Return the live instance of the given object's document, registering the object if there
+        is none. A partial or outdated instance is upgraded in place with the fields of a complete
+        object; a partial instance of the same version gains any fields only the object has. An
+        instance of another version than a partial object is replaced in place by the partial
+        object's fields, and becomes partial."""
+        key = (object.client, object.identifier, object['_id'])
+        with self.lock:
+            instance = self.objects.get(key)
+            if instance is None:
+                self.objects[key] = object
+                return object
+
+        if instance is object:
+            return instance
+
+        if not object._is_partial and (instance._is_partial or instance._etag != object._etag):
+            instance._is_partial = False
+            instance._set_fields(object._etag, object.data, object._saved)
+        elif instance._etag != object._etag:
+            instance._is_partial = True
+            instance.data.clear()
+            instance._set_fields(object._etag, object.data, object._saved)
+        elif instance._is_partial:
+            for field, value in object.data.items():
+                instance.data.setdefault(field, value)
+        return instance
+
+
+global_map = IdentityMap()
+# The identity map of the innermost active scope in each thread
+scoped = threading.local()
+
+def current():
+    """Return the identity map for the current thread: the map of the innermost active `scope`,
+    else the global map if the `IDENTITY_MAP` setting is enabled, else None"""
+    identity_map = getattr(scoped, 'map', None)
+    if identity_map is None and Settings.IDENTITY_MAP:
+        identity_map = global_map
+    return identity_map
+
+def merge(object):
+    """Return the live instance for the given object in the current identity map, if any"""
+    identity_map = current()
+    if identity_map is None or '_id' not in object:
+        return object
+    return identity_map.merge(object)
+
+@contextmanager
+def scope():
+    """Use a separate identity map within this context in the current thread, for example for a
+    single web request. Yields the identity map."""
+    identity_map = IdentityMap()
+    previous = getattr(scoped, 'map', None)
+    scoped.map = identity_map
+    try:
+        yield identity_map
+    finally:
+        scoped.map = previous
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import requests
+
+from .settings import Settings
+
+logger = logging.getLogger('turbasen')
+
+class MediaCache:
+    """
+    On-disk cache of the image files of `Bilde` documents. Files are stored under a name derived
+    from the image URL and, if the image variant has one, its checksum or ETag, so a changed image
+    is stored as a new file. Downloads run concurrently over a pool of persistent connections, with
+    `WORKERS` from `settings`, e.g. a client's settings.
+    """
+
+    def __init__(self, directory, settings=Settings):
+        self.directory = directory
+        self.settings = settings
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=settings.WORKERS,
+            pool_maxsize=settings.WORKERS,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def path(self, variant):
+        """Return the cache path for an image variant, which is a dict with at least an 'url'"""
+        version = variant.get('checksum') or variant.get('etag') or ''
+        key = hashlib.sha1(('%s\n%s' % (variant['url'], version)).encode('utf-8')).hexdigest()
+        extension = os.path.splitext(variant['url'].split('?')[0])[1]
+        return os.path.join(self.directory, key[:2], key + extension)
+
+    def download(self, bilder, refresh=False):
+        """
+        Download all image variants (the 'img' field) of the given `Bilde` objects, returning a dict
+        of image URLs to file paths. Cached files are used without any request, unless `refresh` is
+        set, in which case files without a checksum are revalidated with conditional requests.
+        """
+        variants = {}
+        for bilde in bilder:
+            for variant in bilde.get_field('img') or []:
+                if 'url' in variant:
+                    variants[variant['url']] = variant
+
+        with ThreadPoolExecutor(max_workers=self.settings.WORKERS) as executor:
+            paths = executor.map(lambda variant: self.fetch(variant, refresh), variants.values())
+            return dict(zip(variants, paths))
+
+    def prefetch(self, objects, refresh=False):
+        """Download the images referenced in the 'bilder' field of the given objects, for example
+        a list of `Sted` or `Tur` objects"""
+        objects = list(objects)
+        if objects:
+            type(objects[0])._prefetch(objects, ['bilder'])
+        bilder = {}
+        for object in objects:
+            for bilde in object.references('bilder'):
+                bilder[bilde['_id']] = bilde
+        return self.download(bilder.values(), refresh)
+
+    def fetch(self, variant, refresh=False):
+        """Return the path of the cached file for an image variant, downloading it if needed"""
+        path = self.path(variant)
+        metadata_path = path + '.json'
+        exists = os.path.exists(path)
+        if exists and (not refresh or variant.get('checksum') or variant.get('etag')):
+            return path
+
+        headers = {}
+        if exists and os.path.exists(metadata_path):
+            with open(metadata_path) as metadata_file:
+                metadata = json.load(metadata_file)
+            if metadata.get('etag'):
+                headers['if-none-match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                headers['if-modified-since'] = metadata['last_modified']
+
+        response = self.session.get(variant['url'], headers=headers, stream=True)
+        if response.status_code == 304:
+            logger.debug("[MediaCache %s]: Not modified", variant['url'])
+            response.close()
+            return path
+        response.raise_for_status()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as file:
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    file.write(chunk)
+            except BaseException:
+                # Don't leave partial downloads behind
+                file.close()
+                os.unlink(file.name)
+                raise
+        os.replace(file.name, path)
+
+        with open(metadata_path, 'w') as metadata_file:
+            json.dump({
+                'url': variant['url'],
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+            }, metadata_file)
+        logger.debug("[MediaCache %s]: Downloaded to %s", variant['url'], path)
+        return path
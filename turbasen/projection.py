@@ -0,0 +1,44 @@
+from collections import Counter
+import sys
+import threading
+
+# Fields that caused partial objects to be fetched, by datatype identifier and field, with the
+# number of fetches per call site
+fetches = {}
+lock = threading.Lock()
+
+def record(object, key, depth=2):
+    """Record that accessing `key` on the given partial object caused it to be fetched. The call
+    site is the caller `depth` frames up from this function. Only field names are recorded; other
+    keys can't be fields."""
+    if not isinstance(key, str):
+        return
+    frame = sys._getframe(depth)
+    call_site = '%s:%s' % (frame.f_code.co_filename, frame.f_lineno)
+    with lock:
+        fields = fetches.setdefault(object.identifier, {})
+        fields.setdefault(key, Counter())[call_site] += 1
+
+def suggested_fields(collection):
+    """Return the fields that have caused partial objects of the given datatype to be fetched"""
+    with lock:
+        return sorted(fetches.get(collection.identifier, {}))
+
+def report():
+    """Return the recorded partial fetches, as a dict of datatype identifiers to dicts of fields to
+    the number of fetches and the call sites causing them"""
+    with lock:
+        return {
+            identifier: {
+                field: {
+                    'fetches': sum(call_sites.values()),
+                    'call_sites': dict(call_sites),
+                }
+                for field, call_sites in fields.items()
+            }
+            for identifier, fields in fetches.items()
+        }
+
+def reset():
+    with lock:
+        fetches.clear()
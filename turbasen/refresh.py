@@ -0,0 +1,176 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+
+from . import events
+from .exceptions import DocumentNotFound
+from .sync import reconcile
+from .util import params_to_cache_key
+
+logger = logging.getLogger('turbasen')
+
+class RefreshAhead:
+    """
+    Keeps frequently used objects and lists fresh in the cache, so that no lookup has to wait for
+    an expired entry. Counts how often each object is retrieved with `get` and each list with
+    `list`, and every `interval` seconds revalidates the objects and lists used at least
+    `min_accesses` times that would otherwise go stale before the next refresh. Objects are
+    revalidated with conditional requests, which also renews their cache entries. Access counts are
+    halved after each refresh, so only recent use counts. A list is first considered fresh when it's
+    first accessed, as the time its cache entry was stored isn't known.
+
+    Refreshes run concurrently, with the largest `WORKERS` setting of the datatypes being
+    refreshed. The datatype classes in `collections` are loaded into the cache when started.
+    """
+
+    def __init__(self, interval=60, min_accesses=2, collections=()):
+        self.interval = interval
+        self.min_accesses = min_accesses
+        self.collections = collections
+        self.objects = {}
+        self.lists = {}
+        self.lock = threading.Lock()
+        self.stopped = None
+        self.thread = None
+
+    def handle_object_accessed(self, object):
+        if '_id' not in object:
+            return
+        key = (type(object), object['_id'])
+        with self.lock:
+            self.objects[key] = self.objects.get(key, 0) + 1
+
+    def handle_list_accessed(self, collection, pages, params):
+        key = (collection, pages, params_to_cache_key(params))
+        with self.lock:
+            entry = self.lists.setdefault(key, {
+                'params': params,
+                'accesses': 0,
+                'refreshed': time.monotonic(),
+            })
+            entry['accesses'] += 1
+
+    def warm(self):
+        """Load all documents of the configured collections into the cache"""
+        for collection in self.collections:
+            objects = {}
+            reconcile(collection, objects)
+            logger.debug(
+                "[RefreshAhead %s]: Warmed %s documents",
+                collection.identifier,
+                len(objects),
+            )
+
+    def refresh(self):
+        """Revalidate the popular objects and lists going stale before the next refresh. Returns
+        the number of objects and lists refreshed."""
+        with self.lock:
+            objects = [
+                key for key, accesses in self.objects.items()
+                if accesses >= self.min_accesses
+            ]
+            lists = [
+                (key, entry) for key, entry in self.lists.items()
+                if entry['accesses'] >= self.min_accesses
+            ]
+            self.decay()
+
+        now = datetime.now()
+        stale_objects = []
+        for collection, object_id in objects:
+            object = collection._get_local(object_id)
+            expiry = timedelta(seconds=collection.settings.ETAG_CACHE_PERIOD - self.interval)
+            if object is not None and now - object._saved >= expiry:
+                stale_objects.append(object)
+
+        stale_lists = []
+        for key, entry in lists:
+            expiry = key[0].settings.CACHE_LOOKUP_PERIOD - self.interval
+            if time.monotonic() - entry['refreshed'] >= expiry:
+                stale_lists.append((key, entry))
+
+        if not stale_objects and not stale_lists:
+            logger.debug("[RefreshAhead]: Nothing to refresh")
+            return 0
+
+        collections = [type(object) for object in stale_objects]
+        collections += [key[0] for key, entry in stale_lists]
+        workers = max(collection.settings.WORKERS for collection in collections)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.refresh_object, object) for object in stale_objects]
+            futures += [executor.submit(self.refresh_list, *stale) for stale in stale_lists]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception("[RefreshAhead]: Refresh failed")
+
+        logger.debug(
+            "[RefreshAhead]: Refreshed %s objects and %s lists",
+            len(stale_objects),
+            len(stale_lists),
+        )
+        return len(stale_objects) + len(stale_lists)
+
+    def refresh_object(self, object):
+        try:
+            object._refresh(force=True)
+        except DocumentNotFound:
+            object.settings.CACHE.delete(object._cache_key('object.%s' % object['_id']))
+            with self.lock:
+                self.objects.pop((type(object), object['_id']), None)
+
+    def refresh_list(self, key, entry):
+        collection, pages, digest = key
+        params = dict(entry['params'])
+        collection._load_list(collection._list_cache_key(pages, params), pages, params)
+        entry['refreshed'] = time.monotonic()
+
+    def decay(self):
+        """Halve all access counts, forgetting objects and lists that are no longer used"""
+        self.objects = {
+            key: accesses // 2 for key, accesses in self.objects.items() if accesses // 2
+        }
+        for key, entry in list(self.lists.items()):
+            entry['accesses'] //= 2
+            if not entry['accesses']:
+                del self.lists[key]
+
+    def start(self):
+        """Start tracking accesses, and warm the cache and refresh in a background thread"""
+        if self.thread is not None:
+            return
+        events.handle_event('object.accessed', self.handle_object_accessed)
+        events.handle_event('list.accessed', self.handle_list_accessed)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run,
+            args=(self.stopped,),
+            name='turbasen-refresh',
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self):
+        """Stop tracking accesses, and stop the background thread after the current refresh. Does
+        nothing if not started."""
+        if self.thread is None:
+            return
+        events.remove_handler('object.accessed', self.handle_object_accessed)
+        events.remove_handler('list.accessed', self.handle_list_accessed)
+        self.stopped.set()
+        self.thread = None
+
+    def run(self, stopped):
+        try:
+            self.warm()
+        except Exception:
+            logger.exception("[RefreshAhead]: Warming failed")
+
+        while not stopped.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("[RefreshAhead]: Refresh failed")
@@ -0,0 +1,156 @@
+"""
+Recording and replay of the HTTP traffic between the client and Turbasen, for deterministic
+benchmarks and tests without network access.
+
+A recording is a text file (gzip compressed if the path ends with `.gz`) with a header line followed
+by one JSON line per request, with the method, path, parameters and conditional request headers,
+and the response status, headers and body, along with the time the request started (relative to
+the start of the recording) and the time it took. API keys are not recorded.
+
+Only requests sent with the session are recorded. Requests by other sessions, such as the image
+downloads of `turbasen.media.MediaCache` or the module level datatypes, are not.
+
+Use the sessions with a `turbasen.TurbasenClient`:
+
+    client = turbasen.TurbasenClient(session=RecordingSession('traffic.jsonl.gz'))
+    client = turbasen.TurbasenClient(session=ReplaySession('traffic.jsonl.gz', speed=1))
+"""
+from collections import deque
+from urllib.parse import urlsplit
+import json
+import logging
+import threading
+import time
+
+import requests
+
+from .snapshot import open_snapshot
+
+logger = logging.getLogger('turbasen')
+
+HEADER = 'turbasen-recording 1\n'
+
+# Request headers that change the response, and response headers used by the client
+REQUEST_HEADERS = ['if-none-match', 'if-modified-since']
+RESPONSE_HEADERS = ['content-type', 'etag', 'last-modified']
+
+def request_key(method, url, params=None, headers=None):
+    """Return the key identifying equivalent requests: the method, path, parameters except the API
+    key, and conditional request headers"""
+    params = {key: str(value) for key, value in (params or {}).items() if key != 'api_key'}
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    return json.dumps([
+        method,
+        urlsplit(url).path,
+        params,
+        {key: headers[key] for key in REQUEST_HEADERS if key in headers},
+    ], sort_keys=True)
+
+class Session:
+    """Base class implementing the subset of the requests session API used by the client"""
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+class RecordingSession(Session):
+    """Performs requests with the given requests session (or module), and records each request and
+    response to the file at `path`"""
+
+    def __init__(self, path, session=requests):
+        self.session = session
+        self.file = open_snapshot(path, 'w')
+        self.file.write(HEADER)
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        started = time.monotonic()
+        response = self.session.request(method, url, params=params, headers=headers, **kwargs)
+        elapsed = time.monotonic() - started
+
+        record = {
+            'key': json.loads(request_key(method, url, params, headers)),
+            'started': started - self.start,
+            'elapsed': elapsed,
+            'status': response.status_code,
+            'headers': {
+                key: response.headers[key] for key in RESPONSE_HEADERS if key in response.headers
+            },
+            'body': response.text,
+        }
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        return response
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+        if hasattr(self.session, 'close'):
+            self.session.close()
+
+class ReplaySession(Session):
+    """
+    Responds to requests with the responses in the recording at `path`, without network access.
+    Equivalent requests are answered with their recorded responses in order, repeating the last
+    one when exhausted. Raises LookupError for requests that weren't recorded.
+
+    By default responses are returned immediately. Set `speed` to replay the recorded timing divided
+    by `speed`, e.g. 1 for the original timing or 2 for twice as fast: each response takes at least
+    its recorded time, and isn't returned before it was in the recording, counting from the first
+    request. Requests sent sooner after each other than they were recorded are thereby spaced out as
+    recorded.
+    """
+
+    def __init__(self, path, speed=None):
+        self.speed = speed
+        self.start = None
+        self.responses = {}
+        self.lock = threading.Lock()
+        with open_snapshot(path, 'r') as recording:
+            if recording.readline() != HEADER:
+                raise ValueError("%s is not a turbasen recording" % path)
+            for line in recording:
+                record = json.loads(line)
+                key = json.dumps(record['key'], sort_keys=True)
+                self.responses.setdefault(key, deque()).append(record)
+
+    def __len__(self):
+        return sum(len(records) for records in self.responses.values())
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        key = request_key(method, url, params, headers)
+        with self.lock:
+            records = self.responses.get(key)
+            if not records:
+                raise LookupError("No recorded response for %s %s %s" % (method, url, params))
+            record = records.popleft() if len(records) > 1 else records[0]
+            if self.start is None and self.speed is not None:
+                # The replay starts when the first request was recorded
+                self.start = time.monotonic() - record['started'] / self.speed
+
+        if self.speed is not None:
+            finished = self.start + (record['started'] + record['elapsed']) / self.speed
+            time.sleep(max(finished - time.monotonic(), record['elapsed'] / self.speed))
+
+        response = requests.Response()
+        response.status_code = record['status']
+        response.headers.update(record['headers'])
+        response._content = record['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,139 @@
+import bisect
+import re
+import threading
+import unicodedata
+
+from . import events
+
+FOLDED_CHARACTERS = str.maketrans({'æ': 'ae', 'ø': 'o', 'å': 'a'})
+
+def fold(text):
+    """Lowercase the given text, replacing æ, ø and å with ae, o and a and removing other accents,
+    so that for example 'Kåfjorddalen' and 'kafjorddalen' are equal"""
+    text = text.lower().translate(FOLDED_CHARACTERS)
+    return ''.join(
+        character for character in unicodedata.normalize('NFKD', text)
+        if not unicodedata.combining(character)
+    )
+
+def tokenize(text):
+    """Return the folded words in the given text"""
+    return re.findall(r'\w+', fold(text))
+
+class SearchIndex:
+    """
+    Local inverted index for full-text search in documents, by default in the fields 'navn',
+    'beskrivelse' and 'tags'. Searches match words by prefix, and documents matching in 'navn' are
+    ranked first, which makes the index suitable for autocompletion.
+
+    Documents are indexed with `add`, or automatically when retrieved or changed after calling
+    `watch`.
+    """
+    FIELDS = ['navn', 'beskrivelse', 'tags']
+
+    def __init__(self, fields=FIELDS):
+        self.fields = fields
+        self.postings = {}
+        self.terms = []
+        self.objects = {}
+        self.document_terms = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.objects)
+
+    def add(self, object):
+        """Index the given object, replacing any previously indexed version of it"""
+        key = (object.identifier, object['_id'])
+        terms = {}
+        for field in self.fields:
+            value = object.get_field(field)
+            if isinstance(value, str):
+                value = [value]
+            elif not isinstance(value, list):
+                continue
+            for text in value:
+                if isinstance(text, str):
+                    for term in tokenize(text):
+                        terms.setdefault(term, set()).add(field)
+
+        with self.lock:
+            self._remove(key)
+            self.objects[key] = object
+            self.document_terms[key] = terms
+            for term, fields in terms.items():
+                if term not in self.postings:
+                    self.postings[term] = {}
+                    bisect.insort(self.terms, term)
+                self.postings[term][key] = fields
+
+    def remove(self, object):
+        """Remove the given object from the index"""
+        with self.lock:
+            self._remove((object.identifier, object['_id']))
+
+    def _remove(self, key):
+        self.objects.pop(key, None)
+        for term in self.document_terms.pop(key, {}):
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+
+    def search(self, query, collection=None, limit=None):
+        """
+        Return the indexed objects matching all words in the query, where each word matches indexed
+        words starting with it. Objects matching all words in 'navn' come first, then by name.
+        Optionally only return objects of the datatype class `collection`, and at most `limit`
+        objects.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self.lock:
+            matches = None
+            for token in tokens:
+                token_matches = {}
+                index = bisect.bisect_left(self.terms, token)
+                while index < len(self.terms) and self.terms[index].startswith(token):
+                    for key, fields in self.postings[self.terms[index]].items():
+                        token_matches.setdefault(key, set()).update(fields)
+                    index += 1
+
+                if matches is None:
+                    matches = {key: [fields] for key, fields in token_matches.items()}
+                else:
+                    matches = {
+                        key: matches[key] + [token_matches[key]]
+                        for key in matches if key in token_matches
+                    }
+
+            results = []
+            for key, token_fields in matches.items():
+                if collection is not None and key[0] != collection.identifier:
+                    continue
+                object = self.objects[key]
+                in_navn = all('navn' in fields for fields in token_fields)
+                results.append(((not in_navn, fold(object.get_field('navn') or '')), object))
+
+        results.sort(key=lambda result: result[0])
+        objects = [object for rank, object in results]
+        return objects[:limit] if limit is not None else objects
+
+    def watch(self):
+        """Keep the index up to date with all complete objects retrieved or changed through the
+        client, and with changes detected by a change feed"""
+        events.handle_event('object.fields_set', self.handle_fields_set)
+        events.handle_event('object.deleted', self.remove)
+        events.handle_event('document.deleted', self.remove)
+
+    def unwatch(self):
+        events.remove_handler('object.fields_set', self.handle_fields_set)
+        events.remove_handler('object.deleted', self.remove)
+        events.remove_handler('document.deleted', self.remove)
+
+    def handle_fields_set(self, object):
+        if not object._is_partial and '_id' in object:
+            self.add(object)
@@ -19,12 +19,41 @@ class Settings(metaclass=MetaSettings):
     CACHE_LOOKUP_PERIOD = 60 * 60 * 24
     CACHE_GET_PERIOD = 60 * 60 * 24 * 30
     ETAG_CACHE_PERIOD = 60 * 60
+    CACHE_KEY_VERSION = 1
+    STORE = None
+    IDENTITY_MAP = False
     API_KEY = os.environ.get('API_KEY', '')
+    WORKERS = 8
+    FIELD_PROFILING = False
+    AUTO_FIELDS = False
+    EVENT_DISPATCH = 'sync'
+    EVENT_QUEUE_SIZE = 1000
+    EVENT_OVERFLOW = 'drop_new'
+    EVENT_SLOW_HANDLER_PERIOD = 0.1
+    COMPRESSION = True
+    HTTP2 = False
+    HEDGE_PERCENTILE = None
+    HEDGE_RATIO = 0.05
 
 def configure(**settings):
+    apply_settings(Settings, settings)
+
+def apply_settings(target, settings):
     for key, value in settings.items():
         # Strip any trailing slash in ENDPOINT_URL
         if key == 'ENDPOINT_URL':
             value = value.rstrip('/')
 
-        setattr(Settings, key, value)
+        setattr(target, key, value)
+
+def copy_settings(**settings):
+    """Return a new settings class with the current global settings, overridden by the given
+    settings. Later changes to the global settings don't affect the copy."""
+    values = {
+        name: getattr(Settings, name)
+        for name in dir(Settings)
+        if not name.startswith('_')
+    }
+    copy = MetaSettings('Settings', (), values)
+    apply_settings(copy, settings)
+    return copy
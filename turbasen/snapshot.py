@@ -0,0 +1,83 @@
+"""
+Snapshots of complete collections, for warm starts without retrieving every document from the API.
+
+A snapshot is a text file (gzip compressed if the path ends with `.gz`) with a header line followed
+by one line per document with these tab-separated columns:
+
+    identifier, object id, ETag, retrieval time (POSIX timestamp), document (JSON)
+
+The id columns allow documents to be located without decoding them, see `turbasen.store`.
+"""
+from datetime import datetime
+import gzip
+import json
+import logging
+
+from .apiclient import NTBObject
+from .settings import Settings
+from .sync import reconcile
+
+logger = logging.getLogger('turbasen')
+
+HEADER = 'turbasen-snapshot 1\n'
+
+def open_snapshot(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def format_line(object):
+    return '%s\t%s\t%s\t%r\t%s\n' % (
+        object.identifier,
+        object['_id'],
+        object._etag,
+        object._saved.timestamp(),
+        json.dumps(object.data, ensure_ascii=False, separators=(',', ':')),
+    )
+
+def parse_line(line, collection=None, client=None):
+    """Return an object for a snapshot line. The datatype is looked up from the identifier column,
+    among the datatypes of `client` if given, unless `collection` is given."""
+    identifier, object_id, etag, saved, document = line.rstrip('\n').split('\t', 4)
+    if collection is None:
+        collection = NTBObject._datatype(identifier) if client is None else (
+            client.datatypes[identifier]
+        )
+    return collection(
+        _etag=etag,
+        _saved=datetime.fromtimestamp(float(saved)),
+        **json.loads(document)
+    )
+
+def dump(collections, path):
+    """Retrieve all documents in the given datatype classes and write them to a snapshot file.
+    Documents are retrieved concurrently, using the cache. Returns the number of documents
+    written."""
+    count = 0
+    with open_snapshot(path, 'w') as snapshot:
+        snapshot.write(HEADER)
+        for collection in collections:
+            objects = {}
+            reconcile(collection, objects)
+            for object in objects.values():
+                snapshot.write(format_line(object))
+            count += len(objects)
+            logger.debug("[snapshot.dump %s]: Wrote %s documents", collection.identifier, count)
+    return count
+
+def load(path, client=None):
+    """Load all documents in a snapshot file into the configured cache, or the cache of the given
+    `turbasen.TurbasenClient`. Objects keep the retrieval
+    time from the snapshot, so they are revalidated with an ETag check on first access if older than
+    `ETAG_CACHE_PERIOD`. Returns the number of documents loaded."""
+    count = 0
+    with open_snapshot(path, 'r') as snapshot:
+        if snapshot.readline() != HEADER:
+            raise ValueError("%s is not a turbasen snapshot" % path)
+        for line in snapshot:
+            # Constructing the object caches it
+            parse_line(line, client=client)
+            count += 1
+    cache = Settings.CACHE if client is None else client.settings.CACHE
+    logger.debug("[snapshot.load %s]: Loaded %s documents into %r", path, count, cache)
+    return count
@@ -0,0 +1,60 @@
+import logging
+import mmap
+
+from .snapshot import HEADER, parse_line
+
+logger = logging.getLogger('turbasen')
+
+class SnapshotStore:
+    """
+    Read-only document store backed by an uncompressed snapshot file (see `turbasen.snapshot`).
+    The file is memory-mapped, so worker processes opening the same file share its pages through
+    the operating system's page cache. Only an index of object ids to line offsets is held in
+    process memory, and documents are decoded when accessed.
+
+    Configure with `turbasen.configure(STORE=SnapshotStore(path))`; `get` and partial object
+    fetches then consult the store after the cache, before performing any request.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = HEADER.encode('utf-8')
+        if self.map[:len(header)] != header:
+            self.map.close()
+            raise ValueError("%s is not a turbasen snapshot" % path)
+
+        self.index = {}
+        start = len(header)
+        while start < len(self.map):
+            end = self.map.find(b'\n', start)
+            if end == -1:
+                end = len(self.map)
+            identifier_end = self.map.find(b'\t', start, end)
+            id_end = self.map.find(b'\t', identifier_end + 1, end)
+            object_id = self.map[identifier_end + 1:id_end].decode('ascii')
+            self.index[object_id] = (self.map[start:identifier_end].decode('utf-8'), start, end)
+            start = end + 1
+        logger.debug("[SnapshotStore %s]: Indexed %s documents", path, len(self.index))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, object_id):
+        return object_id in self.index
+
+    def get(self, collection, object_id):
+        """Return an object of the given datatype class with the given id, or None if the store
+        doesn't contain it"""
+        try:
+            identifier, start, end = self.index[object_id]
+        except KeyError:
+            return None
+        if identifier != collection.identifier:
+            return None
+        return parse_line(self.map[start:end].decode('utf-8'), collection)
+
+    def close(self):
+        self.map.close()
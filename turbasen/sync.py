@@ -0,0 +1,187 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import threading
+
+from . import events
+from .apiclient import NTBObject
+from .exceptions import DocumentNotFound
+from .util import params_to_cache_key, params_to_dotnotation
+
+logger = logging.getLogger('turbasen')
+
+Changes = namedtuple('Changes', ['created', 'updated', 'deleted'])
+
+class ChecksumIterator(NTBObject.NTBIterator):
+    """Iterates a collection retrieving only the object id and checksum of each document. Pages
+    aren't cached, since revalidating a cached page would take the same request."""
+    DEFAULT_FIELDS = ['checksum']
+
+    def get_page(self, params):
+        return self.cls._request_list(params).json()
+
+def reconcile(collection, local_store, params=dict()):
+    """
+    Bring a local copy of a collection up to date with Turbasen. Lists only the id and checksum of
+    all documents, compares them with the ETags of the objects in `local_store`, and retrieves full
+    documents only for new and changed ids. Objects that no longer exist are removed from
+    `local_store` and the cache. Cached lists of the collection are invalidated only if the server
+    changed: if a cached object was changed or deleted, or the ids and checksums differ from those
+    of the previous reconciliation with the same params.
+    Arguments:
+    - collection: Datatype class, e.g. `turbasen.Tur`
+    - local_store: Mapping of object id to objects of the datatype, e.g. a dict
+    - params: Dictionary
+        Optional API filter parameters limiting the documents to reconcile
+    Returns a `Changes` tuple with lists of created, updated and deleted object ids.
+    """
+    params = params_to_dotnotation(params.copy())
+    params.pop('fields', None)
+    remote = {
+        object['_id']: object._etag
+        for object in ChecksumIterator(collection, None, params)
+    }
+
+    cache = collection.settings.CACHE
+    checksums_key = collection._cache_key('checksums.%s.%s' % (
+        collection.identifier,
+        params_to_cache_key(params),
+    ))
+    checksums = hashlib.sha1(json.dumps(sorted(remote.items())).encode('utf-8')).hexdigest()
+    previous_checksums = cache.get(checksums_key)
+    changed = previous_checksums is not None and previous_checksums != checksums
+    cache.set(checksums_key, checksums, collection.settings.CACHE_GET_PERIOD)
+
+    created = [object_id for object_id in remote if object_id not in local_store]
+    updated = [
+        object_id for object_id, etag in remote.items()
+        if object_id in local_store and local_store[object_id]._etag != etag
+    ]
+    deleted = [object_id for object_id in local_store if object_id not in remote]
+    logger.debug(
+        "[reconcile %s]: %s created, %s updated, %s deleted",
+        collection.identifier,
+        len(created),
+        len(updated),
+        len(deleted),
+    )
+
+    def fetch(object_id):
+        """Return the id, the current object or None if it was deleted, and whether a cached
+        object was outdated"""
+        # Prefer a cached object, if it matches the current checksum
+        cached = collection._rebind(cache.get(collection._cache_key('object.%s' % object_id)))
+        if cached is not None and cached._etag == remote[object_id]:
+            return object_id, cached, False
+
+        try:
+            headers, document = collection._get_document(object_id)
+        except DocumentNotFound:
+            # Deleted after the listing
+            return object_id, None, cached is not None
+        return object_id, collection(_etag=headers['etag'], **document), cached is not None
+
+    with ThreadPoolExecutor(max_workers=collection.settings.WORKERS) as executor:
+        for object_id, object, outdated in executor.map(fetch, created + updated):
+            changed = changed or outdated
+            if object is not None:
+                local_store[object_id] = object
+            elif object_id in local_store:
+                deleted.append(object_id)
+            else:
+                created.remove(object_id)
+
+    for object_id in deleted:
+        del local_store[object_id]
+        object_key = collection._cache_key('object.%s' % object_id)
+        if cache.get(object_key) is not None:
+            changed = True
+            cache.delete(object_key)
+
+    changes = Changes(created, [id for id in updated if id not in deleted], deleted)
+    if changed:
+        # Cached lists of the collection may contain stale documents
+        collection._invalidate_lists()
+    return changes
+
+class ChangeFeed:
+    """
+    Polls watched collections for changes in Turbasen, and triggers the events `document.created`,
+    `document.updated` and `document.deleted` with the changed object for each change. Each
+    collection is polled once per interval with `reconcile`, regardless of how many consumers watch
+    it or handle its events. The first poll of a collection records the id and checksum of its
+    documents, without retrieving them, and triggers no events. Until a document is changed, its
+    object is therefore partial.
+    """
+
+    def __init__(self, interval=60):
+        self.interval = interval
+        self.stores = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def watch(self, collection):
+        """Include the given datatype class in the feed. Has no effect if it's already watched."""
+        with self.lock:
+            if collection.identifier not in self.stores:
+                self.stores[collection.identifier] = (collection, None)
+
+    def get_objects(self, collection):
+        """Return a dict of object ids to objects with the last polled state of the collection"""
+        return self.stores[collection.identifier][1]
+
+    def poll(self):
+        """Poll all watched collections once, triggering events for any changes"""
+        with self.lock:
+            collections = list(self.stores.values())
+
+        for collection, store in collections:
+            if store is None:
+                store = {
+                    object['_id']: object
+                    for object in ChecksumIterator(collection, None, {})
+                }
+                with self.lock:
+                    self.stores[collection.identifier] = (collection, store)
+                continue
+
+            previous = dict(store)
+            changes = reconcile(collection, store)
+            for object_id in changes.created:
+                events.trigger('document.created', store[object_id])
+            for object_id in changes.updated:
+                events.trigger('document.updated', store[object_id])
+            for object_id in changes.deleted:
+                events.trigger('document.deleted', previous[object_id])
+
+    def start(self):
+        """Start polling in a background thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='turbasen-changefeed', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background thread after the current poll"""
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("[ChangeFeed]: Polling failed")
+            self.stopped.wait(self.interval)
+
+
+# A shared feed for all consumers in this process
+feed = ChangeFeed()
+
+def watch(collection):
+    """Watch the given datatype class with the shared change feed, starting it if necessary"""
+    feed.watch(collection)
+    feed.start()
@@ -0,0 +1,139 @@
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import brotli # noqa
+except ImportError:
+    try:
+        import brotlicffi as brotli # noqa
+    except ImportError:
+        brotli = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+def accept_encoding():
+    """Return the content encodings the client can decode: gzip and deflate, and br if a Brotli
+    package is installed"""
+    return 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+def create_session(settings):
+    """
+    Return an HTTP session for the given settings, with a pool of `WORKERS` persistent connections.
+    Responses are compressed unless `COMPRESSION` is disabled. With `HTTP2` enabled, the session is
+    an httpx client, which multiplexes concurrent requests over one connection per host.
+    """
+    headers = {'Accept-Encoding': accept_encoding() if settings.COMPRESSION else 'identity'}
+
+    if settings.HTTP2:
+        if httpx is None:
+            raise ImportError("HTTP/2 requires httpx: pip install turbasen[http2]")
+        return HTTP2Session(httpx.Client(
+            http2=True,
+            headers=headers,
+            limits=httpx.Limits(max_connections=settings.WORKERS),
+            timeout=None,
+        ))
+
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=settings.WORKERS,
+        pool_maxsize=settings.WORKERS,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class SettingsSession:
+    """
+    The session of the module level datatypes. Requests are sent with a session created by
+    `create_session` for the global settings when first used, and created again after any of the
+    `WORKERS`, `COMPRESSION` and `HTTP2` settings change.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.session = None
+        self.options = None
+        self.lock = threading.Lock()
+
+    def current(self):
+        """Return the session for the current settings"""
+        options = (self.settings.WORKERS, self.settings.COMPRESSION, self.settings.HTTP2)
+        with self.lock:
+            if options != self.options:
+                # Requests in progress keep using the previous session, which is closed when it's
+                # garbage collected
+                self.session = create_session(self.settings)
+                self.options = options
+            return self.session
+
+    def request(self, method, url, **kwargs):
+        return self.current().request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        with self.lock:
+            if self.session is not None:
+                self.session.close()
+            self.session = None
+            self.options = None
+
+class HTTP2Session:
+    """Adapts an httpx client to the subset of the requests session API used by the client.
+    Responses are returned as requests responses, so they're handled the same way."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method, url, data=None, **kwargs):
+        return to_response(self.client.request(method, url, content=data, **kwargs))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+def to_response(response):
+    """Return a requests response with the status, headers and (decoded) body of an httpx
+    response"""
+    result = requests.Response()
+    result.status_code = response.status_code
+    result.reason = response.reason_phrase
+    result.headers = CaseInsensitiveDict(response.headers)
+    result.url = str(response.url)
+    result.encoding = response.encoding
+    result._content = response.content
+    return result
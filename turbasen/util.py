@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 def params_to_dotnotation(params, path=''):
     """
     Transforms a dict of dicts to query parameters with dotted path as accpted by Turbasen, ex:
@@ -33,3 +36,19 @@ def params_to_dotnotation(params, path=''):
         else:
             dotted_dict.update(params_to_dotnotation(value, path=full_path))
     return dotted_dict
+
+def params_to_cache_key(params):
+    """
+    Returns a stable digest of a dict of query parameters, suitable for use in cache keys shared
+    between processes. Keys are sorted and 'fields' (a list or comma-separated string) is sorted
+    and deduplicated, so equivalent queries produce the same digest regardless of ordering. Values
+    that aren't JSON serializable are represented by their string value.
+    """
+    params = dict(params)
+    if 'fields' in params:
+        fields = params['fields']
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        params['fields'] = sorted(set(fields))
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()